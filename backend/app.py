@@ -1,11 +1,16 @@
-from flask import Flask, request
+from flask import Flask, Response, request, stream_with_context
+import json
+import math
 from os import getenv
 from dotenv import load_dotenv
 from flask_cors import cross_origin, CORS
+import pandas as pd
 load_dotenv()
 
 app = Flask(__name__)
-from chat import Chat
+from chat import Chat, StreamInterrupted
+from conversation import clean_history
+from portfolio import simulate_portfolio, simulate_portfolio_batch, portfolio_to_json
 
 cors = CORS(app, origins=getenv("FRONTEND_URL"))
 chat_instance = Chat()
@@ -16,9 +21,127 @@ chat_instance = Chat()
 def chat():
    if not request.json:
        return {"message": "Invalid request: JSON body required"}, 400
-   message = request.json.get("messages")[-1]['content']
+   messages = clean_history(request.json.get("messages"))
+   if not messages or messages[-1]["role"] != "user":
+       return {"message": "Invalid request: messages must end with a user message"}, 400
    context = request.json.get("context")
-   return chat_instance.response(message, context=context), 200
+   session_id = request.json.get("session_id")
+   if request.json.get("stream"):
+       return stream_response(chat_instance.response_stream(messages, context=context, session_id=session_id))
+   return chat_instance.response(messages, context=context, session_id=session_id), 200
+
+
+def stream_response(chunks):
+   """
+   Send text chunks as server-sent events, ending with a 'done' event, or
+   with an 'error' event if the answer breaks off part way or fails
+   """
+   def events():
+       try:
+           for chunk in chunks:
+               yield f"data: {json.dumps({'token': chunk})}\n\n"
+       except StreamInterrupted:
+           yield f"event: error\ndata: {json.dumps({'message': 'The response was interrupted'})}\n\n"
+           return
+       except Exception as e:
+           # The 200 headers are already out, so the failure can only be reported in the stream
+           print(f"Error in chat stream: {str(e)}")
+           yield f"event: error\ndata: {json.dumps({'message': 'The response could not be generated'})}\n\n"
+           return
+       yield "event: done\ndata: {}\n\n"
+
+   return Response(
+       stream_with_context(events()),
+       mimetype="text/event-stream",
+       # Stop nginx from buffering the stream
+       headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+   )
+
+
+def _parse_start_date(value):
+   """Parse start_date the way the engine does; returns None if it is not a date"""
+   try:
+       start = pd.Timestamp(value)
+   except (TypeError, ValueError):
+       return None
+   return None if pd.isna(start) else start
+
+
+def _finite(*values):
+   return all(math.isfinite(value) for value in values)
+
+
+def _valid_rates(rates):
+   """Rates are optional, but when given must map tickers to finite APYs"""
+   if rates is None:
+       return True
+   return isinstance(rates, dict) and all(
+       isinstance(apy, (int, float)) and not isinstance(apy, bool) and math.isfinite(apy)
+       for apy in rates.values()
+   )
+
+
+@app.route("/api/v1/portfolio", methods=["POST"])
+@cross_origin(supports_credentials=True)
+def portfolio():
+   if not request.json:
+       return {"message": "Invalid request: JSON body required"}, 400
+   allocations = request.json.get("allocations")
+   start_date = request.json.get("start_date")
+   if not isinstance(allocations, dict) or not start_date:
+       return {"message": "Invalid request: allocations and start_date are required"}, 400
+   try:
+       investment_amount = float(request.json.get("investment_amount", 10000))
+       max_points = int(request.json.get("max_points", 250))
+       allocations = {ticker: float(pct) for ticker, pct in allocations.items()}
+   except (TypeError, ValueError):
+       return {"message": "Invalid request: investment_amount, max_points and allocations must be numbers"}, 400
+   if not _finite(investment_amount, *allocations.values()):
+       return {"message": "Invalid request: investment_amount and allocations must be finite"}, 400
+   if _parse_start_date(start_date) is None:
+       return {"message": "Invalid request: start_date must be a date"}, 400
+   rates = request.json.get("rates")
+   if not _valid_rates(rates):
+       return {"message": "Invalid request: rates must map tickers to finite numbers"}, 400
+
+   results, errors = simulate_portfolio(investment_amount, start_date, allocations, rates=rates)
+   if results is None:
+       return {"message": "No portfolio results", "errors": errors}, 422
+   return {**portfolio_to_json(results, max_points=max_points), "errors": errors}, 200
+
+
+# Upper bound on candidates per batch request
+MAX_BATCH_CANDIDATES = 1000
+
+
+@app.route("/api/v1/portfolio/batch", methods=["POST"])
+@cross_origin(supports_credentials=True)
+def portfolio_batch():
+   if not request.json:
+       return {"message": "Invalid request: JSON body required"}, 400
+   candidates = request.json.get("candidates")
+   start_date = request.json.get("start_date")
+   if not isinstance(candidates, list) or not all(isinstance(c, dict) for c in candidates) or not start_date:
+       return {"message": "Invalid request: candidates (list of allocations) and start_date are required"}, 400
+   if len(candidates) > MAX_BATCH_CANDIDATES:
+       return {"message": f"Invalid request: at most {MAX_BATCH_CANDIDATES} candidates per batch"}, 400
+   try:
+       investment_amount = float(request.json.get("investment_amount", 10000))
+       candidates = [{ticker: float(pct) for ticker, pct in c.items()} for c in candidates]
+   except (TypeError, ValueError):
+       return {"message": "Invalid request: investment_amount and allocations must be numbers"}, 400
+   if not _finite(investment_amount, *(pct for c in candidates for pct in c.values())):
+       return {"message": "Invalid request: investment_amount and allocations must be finite"}, 400
+   if _parse_start_date(start_date) is None:
+       return {"message": "Invalid request: start_date must be a date"}, 400
+   rates = request.json.get("rates")
+   if not _valid_rates(rates):
+       return {"message": "Invalid request: rates must map tickers to finite numbers"}, 400
+
+   results, errors = simulate_portfolio_batch(investment_amount, start_date, candidates, rates=rates)
+   if results is None:
+       return {"message": "Batch evaluation failed", "errors": errors}, 422
+   return {"results": results}, 200
 
 
 if __name__ == "__main__":
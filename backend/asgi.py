@@ -0,0 +1,88 @@
+"""
+ASGI server for the LLM endpoint.
+
+The Flask app in app.py runs under sync gunicorn workers, where every
+in-flight completion holds a whole worker. This app serves the same
+/api/v1/llm contract from one event loop with AsyncChat, so a single process
+can hold hundreds of outstanding completions.
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import json
+from os import getenv
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from chat import AsyncChat, StreamInterrupted
+from conversation import clean_history
+
+load_dotenv()
+
+chat_instance = AsyncChat()
+
+
+async def chat(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        body = None
+    if not body:
+        return JSONResponse({"message": "Invalid request: JSON body required"}, status_code=400)
+    messages = clean_history(body.get("messages"))
+    if not messages or messages[-1]["role"] != "user":
+        return JSONResponse({"message": "Invalid request: messages must end with a user message"}, status_code=400)
+    context = body.get("context")
+    session_id = body.get("session_id")
+    if body.get("stream"):
+        return stream_response(chat_instance.response_stream(messages, context=context, session_id=session_id))
+    return JSONResponse(await chat_instance.response(messages, context=context, session_id=session_id))
+
+
+def stream_response(chunks):
+    """
+    Send text chunks as server-sent events, ending with a 'done' event, or
+    with an 'error' event if the answer breaks off part way or fails
+    """
+    async def events():
+        try:
+            async for chunk in chunks:
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except StreamInterrupted:
+            yield f"event: error\ndata: {json.dumps({'message': 'The response was interrupted'})}\n\n"
+            return
+        except Exception as e:
+            # The 200 headers are already out, so the failure can only be reported in the stream
+            print(f"Error in chat stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'message': 'The response could not be generated'})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+middleware = []
+if getenv("FRONTEND_URL"):
+    middleware.append(Middleware(
+        CORSMiddleware,
+        allow_origins=[getenv("FRONTEND_URL")],
+        allow_credentials=True,
+        allow_methods=["POST"],
+        allow_headers=["Content-Type"],
+    ))
+
+app = Starlette(
+    routes=[Route("/api/v1/llm", chat, methods=["POST"])],
+    middleware=middleware,
+)
@@ -0,0 +1,83 @@
+"""
+Asset catalog shared by the Streamlit frontend and the Flask API.
+
+ASSETS is the single declarative source: category -> ticker -> metadata,
+including the dataset file each ticker is stored in. The indexes below are
+built from it once at import, so every per-ticker lookup is a dict access
+no matter how large the catalog grows.
+"""
+
+ASSETS = {
+    'stock': {
+        'SPY': {'name': 'SPDR S&P 500 ETF Trust', 'icon': '🕷️', 'category': 'Stock', 'ticker_yf': 'SPY', 'file': 'spy.csv'},
+        'VOO': {'name': 'Vanguard S&P 500 ETF', 'icon': '🏛️', 'category': 'Stock', 'ticker_yf': 'VOO', 'file': 'df_voo.csv'},
+        'QQQ': {'name': 'Invesco QQQ (Nasdaq-100)', 'icon': '🚀', 'category': 'Stock', 'ticker_yf': 'QQQ', 'file': 'qqq.csv'},
+        'VTI': {'name': 'Vanguard Total Stock Market ETF', 'icon': '📊', 'category': 'Stock', 'ticker_yf': 'VTI', 'file': 'vti.csv'},
+        'IVV': {'name': 'iShares Core S&P 500 ETF', 'icon': '🏢', 'category': 'Stock', 'ticker_yf': 'IVV', 'file': 'ivv.csv'},
+        'SCHD': {'name': 'Schwab US Dividend Equity ETF', 'icon': '💵', 'category': 'Stock', 'ticker_yf': 'SCHD', 'file': 'schd.csv'},
+        'VUG': {'name': 'Vanguard Growth ETF', 'icon': '📈', 'category': 'Stock', 'ticker_yf': 'VUG', 'file': 'vug.csv'},
+        'IWM': {'name': 'iShares Russell 2000 ETF', 'icon': '🏭', 'category': 'Stock', 'ticker_yf': 'IWM', 'file': 'iwm.csv'},
+        'VEA': {'name': 'Vanguard FTSE Developed Markets ETF', 'icon': '🌍', 'category': 'Stock', 'ticker_yf': 'VEA', 'file': 'vea.csv'},
+        'AGG': {'name': 'iShares Core US Aggregate Bond ETF', 'icon': '📜', 'category': 'Stock', 'ticker_yf': 'AGG', 'file': 'agg.csv'},
+    },
+    'crypto': {
+        'BTC': {'name': 'Bitcoin', 'icon': '₿', 'category': 'Cryptocurrency', 'ticker_yf': 'BTC-USD', 'file': 'crypto_btc.csv'},
+        'ETH': {'name': 'Ethereum', 'icon': '⟠', 'category': 'Cryptocurrency', 'ticker_yf': 'ETH-USD', 'file': 'crypto_eth.csv'},
+        'BNB': {'name': 'Binance Coin', 'icon': '🔶', 'category': 'Cryptocurrency', 'ticker_yf': 'BNB-USD', 'file': 'crypto_bnb.csv'},
+        'SOL': {'name': 'Solana', 'icon': '◎', 'category': 'Cryptocurrency', 'ticker_yf': 'SOL-USD', 'file': 'crypto_sol.csv'},
+        'XRP': {'name': 'Ripple', 'icon': '💧', 'category': 'Cryptocurrency', 'ticker_yf': 'XRP-USD', 'file': 'crypto_xrp.csv'},
+        'ADA': {'name': 'Cardano', 'icon': '₳', 'category': 'Cryptocurrency', 'ticker_yf': 'ADA-USD', 'file': 'crypto_ada.csv'},
+        'DOGE': {'name': 'Dogecoin', 'icon': '🐕', 'category': 'Cryptocurrency', 'ticker_yf': 'DOGE-USD', 'file': 'crypto_doge.csv'},
+        'AVAX': {'name': 'Avalanche', 'icon': '🔺', 'category': 'Cryptocurrency', 'ticker_yf': 'AVAX-USD', 'file': 'crypto_avax.csv'},
+    },
+    'fixed_income': {
+        'HY_SAVINGS': {'name': 'High-Yield Savings (Capital One 3.40% APY)', 'icon': '🏦', 'category': 'Fixed Income', 'ticker_yf': None, 'file': 'df_hy_savings.csv'},
+        'CD': {'name': 'Certificate of Deposit (Capital One 3.50% APY)', 'icon': '💰', 'category': 'Fixed Income', 'ticker_yf': None, 'file': 'df_cd.csv'},
+    }
+}
+
+# Fixed-income products generated from an APY (default rates below) instead of loaded from disk
+GENERATED_ASSETS = {
+    'HY_SAVINGS': 3.40,
+    'CD': 3.50,
+}
+
+
+# Catalog category -> asset type understood by get_data.load_asset_data
+CATEGORY_TYPES = {
+    'stock': 'etf',
+    'crypto': 'crypto',
+    'indices': 'index',
+    'fixed_income': 'fixed_income',
+}
+
+ASSET_CATEGORIES = {ticker: category for category, assets in ASSETS.items() for ticker in assets}
+ASSET_TYPES = {ticker: CATEGORY_TYPES.get(category, 'etf') for ticker, category in ASSET_CATEGORIES.items()}
+ASSET_INFO = {ticker: info for assets in ASSETS.values() for ticker, info in assets.items()}
+ASSET_FILES = {ticker: info['file'] for ticker, info in ASSET_INFO.items() if info.get('file')}
+ALL_TICKERS = sorted(ASSET_INFO)
+
+# Assets with price history on disk (everything but the generated products)
+MARKET_ASSETS = {ticker: ASSET_TYPES[ticker] for ticker in ALL_TICKERS if ticker not in GENERATED_ASSETS}
+
+
+def get_asset_type(ticker):
+    return ASSET_TYPES.get(ticker, 'etf')
+
+
+def get_asset_category(ticker):
+    """Catalog category of a ticker ('stock', 'crypto', 'fixed_income'), or None"""
+    return ASSET_CATEGORIES.get(ticker)
+
+
+def get_asset_file(ticker):
+    """Dataset CSV filename of a ticker, or None if it is not in the catalog"""
+    return ASSET_FILES.get(ticker)
+
+
+def get_all_tickers():
+    return list(ALL_TICKERS)
+
+
+def get_asset_info(ticker):
+    return ASSET_INFO.get(ticker)
@@ -4,19 +4,44 @@ Fetch Historical Financial Data using yfinance
 Usage:
     python fetch_financial_data.py                  # Fetch VOO and BTC
     python fetch_financial_data.py --single VOO     # Fetch single ticker
+    python fetch_financial_data.py --refresh        # Append new rows for every catalog asset
+    python fetch_financial_data.py --convert        # Write Parquet copies of the CSVs
 """
 
 import yfinance as yf
 import pandas as pd
 import os
 import sys
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import numpy as np
 
+from assets import ASSET_CATEGORIES, ASSET_INFO, get_asset_file
+from get_data import save_dataset, publish_datasets, convert_dataset_dir, load_asset_data
+
 # Create dataset directory if it doesn't exist
 DATASET_DIR = "./dataset"
 os.makedirs(DATASET_DIR, exist_ok=True)
 
+# Concurrent downloads during --refresh
+REFRESH_WORKERS = 8
+
+DATASET_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Ticker', 'Date']
+# Corporate actions reported by Ticker.history; not stored, only used to spot adjustments
+EVENT_COLUMNS = ['Dividends', 'Stock Splits']
+
+# Each refresh downloads the last few stored days again and overwrites them,
+# so late corrections from Yahoo replace what was stored
+REFRESH_OVERLAP_DAYS = 5
+# Relative change in Adj Close / Close on the overlap that means the history was re-adjusted
+ADJUSTMENT_RTOL = 1e-6
+
+# A daily bar is final once its session has closed: 16:00 New York time for
+# stocks, midnight UTC for crypto (Yahoo's crypto days are UTC days)
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+MARKET_CLOSE_HOUR = 16
+
 def generate_savings_data(apy: float, name: str, filename: str, years: int = 10):
     """
     Generate simulated savings account data with compound interest.
@@ -40,10 +65,7 @@ def generate_savings_data(apy: float, name: str, filename: str, years: int = 10)
         daily_rate = (1 + apy) ** (1/365)
 
         # Start with $100 (base unit price)
-        prices = []
-        for i in range(len(dates)):
-            price = 100 * (daily_rate ** i)
-            prices.append(price)
+        prices = 100 * daily_rate ** np.arange(len(dates))
 
         # Create DataFrame
         data = pd.DataFrame({
@@ -53,16 +75,16 @@ def generate_savings_data(apy: float, name: str, filename: str, years: int = 10)
             'Low': prices,
             'Close': prices,
             'Adj Close': prices,
-            'Volume': [0] * len(dates),  # No volume for savings
+            'Volume': 0,  # No volume for savings
             'Ticker': name
         })
 
         # Reorder columns
         data = data[['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Ticker', 'Date']]
 
-        # Save to CSV
+        # Save to CSV (plus the Parquet copy the loaders prefer)
         filepath = os.path.join(DATASET_DIR, filename)
-        data.to_csv(filepath, index=False)
+        save_dataset(data, filepath)
 
         print(f"  Generated {len(data)} records for {name} ({apy*100:.2f}% APY)")
         print(f"  Saved to {filepath}")
@@ -116,6 +138,36 @@ def generate_savings_accounts():
     print("="*80 + "\n")
 
 
+def normalize_download(data: pd.DataFrame, ticker: str, extra_columns: list = ()) -> pd.DataFrame:
+    """
+    Reshape a yfinance frame into the dataset layout.
+
+    Args:
+        data: Frame from yf.download or Ticker.history (dates in the index)
+        ticker: Value for the Ticker column
+        extra_columns: Further columns to keep when the frame has them (e.g., EVENT_COLUMNS)
+
+    Returns:
+        DataFrame with DATASET_COLUMNS (plus any extra_columns present) and tz-naive dates
+    """
+    data = data.reset_index()
+
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+
+    missing_cols = [col for col in DATASET_COLUMNS if col not in data.columns and col != 'Ticker']
+    if missing_cols:
+        raise ValueError(f"Missing columns for {ticker}: {missing_cols}")
+
+    data['Ticker'] = ticker
+    dates = pd.to_datetime(data['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    data['Date'] = dates.dt.normalize()
+
+    return data[DATASET_COLUMNS + [col for col in extra_columns if col in data.columns]]
+
+
 def fetch_and_save_ticker(ticker: str, period: str = "10y", filename: str = None, start_date: str = None):
     """
     Fetch historical data for a single ticker and save to CSV.
@@ -138,29 +190,14 @@ def fetch_and_save_ticker(ticker: str, period: str = "10y", filename: str = None
             print(f"  No data found for {ticker}")
             return False
 
-        data.reset_index(inplace=True)
-
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
-
-        data['Ticker'] = ticker
-
-        required_cols = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-        missing_cols = [col for col in required_cols if col not in data.columns]
-
-        if missing_cols:
-            print(f"  Missing columns for {ticker}: {missing_cols}")
-            return False
-
-        columns = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Ticker', 'Date']
-        data = data[columns]
+        data = normalize_download(data, ticker)
 
         # Save to CSV
         if filename is None:
             filename = f"{ticker.lower()}.csv"
 
         filepath = os.path.join(DATASET_DIR, filename)
-        data.to_csv(filepath, index=False)
+        save_dataset(data, filepath)
 
         print(f"  Saved {len(data)} records to {filepath}")
         return True
@@ -170,6 +207,241 @@ def fetch_and_save_ticker(ticker: str, period: str = "10y", filename: str = None
         return False
 
 
+def download_history(symbol: str, start: str = None, period: str = "10y") -> pd.DataFrame:
+    """
+    Download daily history for one Yahoo Finance symbol.
+
+    Uses Ticker.history rather than yf.download, which keeps results in
+    module-level state and is not safe to call from several threads at once.
+
+    Args:
+        symbol: Yahoo Finance symbol (e.g., 'VOO', 'BTC-USD')
+        start: First date to fetch (e.g., '2025-01-02') - overrides period
+        period: Time period to fetch when no start is given
+    """
+    if start:
+        return yf.Ticker(symbol).history(start=start, auto_adjust=False)
+    return yf.Ticker(symbol).history(period=period, auto_adjust=False)
+
+
+def dataset_filename(ticker: str, asset_type: str, dataset_dir: str = DATASET_DIR) -> str:
+    """CSV filename the loaders in get_data.py look for (the catalog's, for catalog tickers)"""
+    if get_asset_file(ticker):
+        return get_asset_file(ticker)
+    if asset_type == 'crypto':
+        return f"crypto_{ticker.lower()}.csv"
+    # Keep updating legacy df_<ticker>.csv files in place
+    legacy = f"df_{ticker.lower()}.csv"
+    if os.path.exists(os.path.join(dataset_dir, legacy)):
+        return legacy
+    return f"{ticker.lower()}.csv"
+
+
+def last_closed_session(asset_type: str, now: datetime = None) -> pd.Timestamp:
+    """
+    Date of the newest daily bar whose session has closed, so it will not change any more.
+
+    Args:
+        asset_type: Catalog asset type ('stock' or 'crypto')
+        now: Timezone-aware current time (defaults to the clock)
+    """
+    now = now or datetime.now(timezone.utc)
+    if asset_type == 'crypto':
+        # Today's UTC bar is still being built
+        return pd.Timestamp(now.astimezone(timezone.utc).date()) - pd.Timedelta(days=1)
+
+    local = now.astimezone(MARKET_TIMEZONE)
+    today = pd.Timestamp(local.date())
+    return today if local.hour >= MARKET_CLOSE_HOUR else today - pd.Timedelta(days=1)
+
+
+def session_close(asset_type: str, date) -> datetime:
+    """Timezone-aware time at which the daily bar of `date` became final (see last_closed_session)"""
+    date = pd.Timestamp(date)
+    if asset_type == 'crypto':
+        return datetime(date.year, date.month, date.day, tzinfo=timezone.utc) + timedelta(days=1)
+    return datetime(date.year, date.month, date.day, MARKET_CLOSE_HOUR, tzinfo=MARKET_TIMEZONE)
+
+
+def _adjustment_changed(existing: pd.DataFrame, fetched: pd.DataFrame, last_date: pd.Timestamp) -> bool:
+    """
+    Whether stored prices need re-adjusting: a dividend or split on a new bar,
+    or an Adj Close / Close ratio on the overlapping days that no longer matches
+    """
+    new_rows = fetched[fetched['Date'] > last_date]
+    for col in EVENT_COLUMNS:
+        if col in new_rows.columns and (new_rows[col].fillna(0) != 0).any():
+            return True
+
+    overlap = existing[['Date', 'Close', 'Adj Close']].merge(
+        fetched[['Date', 'Close', 'Adj Close']], on='Date', suffixes=('', '_new'))
+    if overlap.empty:
+        return False
+    stored = (overlap['Adj Close'] / overlap['Close']).to_numpy()
+    current = (overlap['Adj Close_new'] / overlap['Close_new']).to_numpy()
+    return not np.allclose(stored, current, rtol=ADJUSTMENT_RTOL, atol=0, equal_nan=True)
+
+
+def _merge_rows(existing: pd.DataFrame, fetched: pd.DataFrame) -> pd.DataFrame:
+    """Stored rows with fetched rows appended, fetched rows replacing stored ones on the same Date"""
+    combined = pd.concat([existing, fetched[existing.columns]], ignore_index=True)
+    combined = combined.drop_duplicates('Date', keep='last')
+    return combined.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def _same_rows(existing: pd.DataFrame, combined: pd.DataFrame) -> bool:
+    """Whether a merge left the stored rows as they were"""
+    if len(existing) != len(combined):
+        return False
+    numeric = [col for col in existing.columns if col in ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')]
+    return np.allclose(existing[numeric].to_numpy(dtype=float), combined[numeric].to_numpy(dtype=float),
+                       rtol=1e-12, atol=0, equal_nan=True)
+
+
+def fetch_update(ticker: str, asset_type: str, symbol: str, dataset_dir: str = DATASET_DIR,
+                 download=download_history, now: datetime = None) -> tuple:
+    """
+    Build the updated dataset of one asset, up to the last closed session, without publishing it.
+
+    The last REFRESH_OVERLAP_DAYS stored days are downloaded again and
+    overwrite the stored rows. Bars of a session that is still open are
+    never stored. If a new bar carries a dividend or split, or the overlap
+    shows the adjustment changed, the whole stored history is downloaded
+    again, since every earlier Adj Close moves with it. Assets without a
+    stored dataset get the full default history.
+
+    Args:
+        ticker: Catalog ticker (e.g., 'VOO', 'BTC')
+        asset_type: Catalog asset type ('stock' or 'crypto')
+        symbol: Yahoo Finance symbol
+        dataset_dir: Directory holding the datasets
+        download: Function (symbol, start=None) returning a yfinance-style frame
+        now: Timezone-aware current time (defaults to the clock)
+
+    Returns:
+        Tuple (filename, frame, rows added); frame is None when the stored dataset is current
+    """
+    filename = dataset_filename(ticker, asset_type, dataset_dir)
+    closed = last_closed_session(asset_type, now)
+
+    try:
+        existing = load_asset_data(ticker, asset_type, dataset_dir)
+    except FileNotFoundError:
+        existing = None
+
+    if existing is None or existing.empty:
+        data = download(symbol)
+        if data is None or data.empty:
+            return filename, None, 0
+        data = normalize_download(data, symbol)
+        data = data[data['Date'] <= closed]
+        if data.empty:
+            return filename, None, 0
+        return filename, data, len(data)
+
+    last_date = existing['Date'].iloc[-1]
+    # The last closed session is already stored; its overlap is rechecked on the next one
+    if last_date >= closed:
+        return filename, None, 0
+
+    start = last_date - timedelta(days=REFRESH_OVERLAP_DAYS)
+    data = download(symbol, start=start.strftime('%Y-%m-%d'))
+    if data is None or data.empty:
+        return filename, None, 0
+
+    fetched = normalize_download(data, symbol, EVENT_COLUMNS)
+    fetched = fetched[fetched['Date'] <= closed]
+    if fetched.empty:
+        return filename, None, 0
+
+    if _adjustment_changed(existing, fetched, last_date):
+        print(f"  {ticker}: adjustment changed, downloading the full history again")
+        data = download(symbol, start=existing['Date'].iloc[0].strftime('%Y-%m-%d'))
+        if data is None or data.empty:
+            raise ValueError(f"Full history download for {symbol} returned no data")
+        fetched = normalize_download(data, symbol)
+        fetched = fetched[fetched['Date'] <= closed]
+
+    added = int((fetched['Date'] > last_date).sum())
+    combined = _merge_rows(existing, fetched)
+
+    # Nothing new and the overlap came back unchanged: keep the current snapshot
+    if not added and _same_rows(existing, combined):
+        return filename, None, 0
+
+    return filename, combined, added
+
+
+def refresh_ticker(ticker: str, asset_type: str, symbol: str, dataset_dir: str = DATASET_DIR,
+                   download=download_history, now: datetime = None) -> int:
+    """
+    Update and publish one asset's dataset (see fetch_update).
+
+    Returns:
+        Number of rows added
+    """
+    filename, frame, rows = fetch_update(ticker, asset_type, symbol, dataset_dir, download, now)
+    if frame is not None:
+        save_dataset(frame, os.path.join(dataset_dir, filename))
+    return rows
+
+
+def refresh_all_assets(dataset_dir: str = DATASET_DIR, max_workers: int = REFRESH_WORKERS,
+                       download=download_history) -> dict:
+    """
+    Bring every downloadable asset in the catalog up to date, fetching concurrently.
+
+    Args:
+        dataset_dir: Directory holding the datasets
+        max_workers: Maximum concurrent downloads
+        download: Function (symbol, start=None) returning a yfinance-style frame
+
+    Returns:
+        Dictionary mapping ticker to rows added, or None if the refresh failed
+    """
+    print("\n" + "="*80)
+    print("INVESTORLY - Refreshing All Assets")
+    print("="*80 + "\n")
+
+    jobs = [
+        (ticker, ASSET_CATEGORIES[ticker], info['ticker_yf'])
+        for ticker, info in ASSET_INFO.items()
+        if info.get('ticker_yf')
+    ]
+
+    results = {}
+    frames = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_update, ticker, asset_type, symbol, dataset_dir, download): ticker
+            for ticker, asset_type, symbol in jobs
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                filename, frame, results[ticker] = future.result()
+                if frame is not None:
+                    frames[filename] = frame
+                print(f"  {ticker}: {results[ticker]} new records")
+            except Exception as e:
+                results[ticker] = None
+                print(f"  {ticker}: error - {str(e)}")
+
+    # Every updated dataset goes into one snapshot
+    if frames:
+        version = publish_datasets(frames, dataset_dir)
+        print(f"\n  Published {len(frames)} dataset(s) as snapshot {version}")
+
+    successful = sum(1 for rows in results.values() if rows is not None)
+
+    print("\n" + "="*80)
+    print("REFRESH SUMMARY")
+    print("="*80)
+    print(f"\nSuccessfully refreshed: {successful}/{len(jobs)}")
+    print(f"New records: {sum(rows for rows in results.values() if rows)}\n")
+    print("="*80 + "\n")
+
+    return results
 
 
 def fetch_essential_assets():
@@ -239,11 +511,14 @@ def show_help():
     print("Usage:")
     print("  python fetch_financial_data.py              # Fetch VOO and BTC")
     print("  python fetch_financial_data.py --single VOO # Fetch single ticker")
+    print("  python fetch_financial_data.py --refresh    # Append new rows for every catalog asset")
+    print("  python fetch_financial_data.py --convert    # Write Parquet copies of the CSVs")
     print("  python fetch_financial_data.py --help       # Show this help")
     print()
     print("Examples:")
     print("  python fetch_financial_data.py --single VOO")
     print("  python fetch_financial_data.py --single BTC-USD --period 5y")
+    print("  python fetch_financial_data.py --refresh --workers 4")
     print()
     print("="*80 + "\n")
 
@@ -258,6 +533,23 @@ def main():
     elif '--help' in sys.argv or '-h' in sys.argv:
         show_help()
 
+    elif '--convert' in sys.argv:
+        converted = convert_dataset_dir(DATASET_DIR)
+        print(f"Converted {converted} dataset file(s) to Parquet in {DATASET_DIR}")
+
+    elif '--refresh' in sys.argv:
+        try:
+            workers = REFRESH_WORKERS
+            if '--workers' in sys.argv:
+                workers = int(sys.argv[sys.argv.index('--workers') + 1])
+        except (IndexError, ValueError):
+            print("Error: Please provide a number after --workers")
+            return
+
+        results = refresh_all_assets(DATASET_DIR, max_workers=workers)
+        if any(rows is None for rows in results.values()):
+            sys.exit(1)
+
     elif '--single' in sys.argv:
         try:
             idx = sys.argv.index('--single')
@@ -3,14 +3,22 @@ Generate simulated historical data for High-Yield Savings Account and Certificat
 with realistic daily compounding interest rates.
 """
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
 
+from get_data import save_dataset
+
 def generate_daily_compound_data(start_date, end_date, apy, initial_value=10000):
     """
     Generate daily compounded interest data for fixed-income products.
 
+    Results are cached by (apy, start date, number of days, initial value),
+    so repeated calls with end_date=datetime.now() on the same day return the
+    same DataFrame object. Treat it as read-only.
+
     Args:
         start_date: Start date for data generation (datetime object or string)
         end_date: End date for data generation (datetime object or string)
@@ -20,35 +28,27 @@ def generate_daily_compound_data(start_date, end_date, apy, initial_value=10000)
     Returns:
         DataFrame with Date and Close columns representing account value over time
     """
-    # Convert string dates to datetime if needed
-    if isinstance(start_date, str):
-        start_date = pd.to_datetime(start_date)
-    if isinstance(end_date, str):
-        end_date = pd.to_datetime(end_date)
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
 
     # Handle APY as percentage (e.g., 3.4) or decimal (e.g., 0.034)
     if apy > 1:
         apy = apy / 100
 
-    dates = []
-    values = []
+    # One row per day from start_date while the date is <= end_date
+    periods = max((end_date - start_date) // timedelta(days=1) + 1, 0)
+
+    return _compound_series(float(apy), start_date, int(periods), initial_value)
 
-    current_date = start_date
-    current_value = initial_value
 
+@lru_cache(maxsize=32)
+def _compound_series(apy, start_date, periods, initial_value):
     # Daily interest rate (APY to daily rate with 365 compounding periods)
     daily_rate = (1 + apy) ** (1/365) - 1
 
-    while current_date <= end_date:
-        dates.append(current_date)
-        values.append(current_value)
-
-        current_value = current_value * (1 + daily_rate)
-        current_date += timedelta(days=1)
-
     df = pd.DataFrame({
-        'Date': dates,
-        'Close': values
+        'Date': pd.date_range(start=start_date, periods=periods, freq='D'),
+        'Close': initial_value * (1 + daily_rate) ** np.arange(periods),
     })
 
     return df
@@ -83,8 +83,8 @@ def main():
     hy_savings_path = os.path.join(dataset_dir, 'df_hy_savings.csv')
     cd_path = os.path.join(dataset_dir, 'df_cd.csv')
 
-    hy_savings_df.to_csv(hy_savings_path, index=False)
-    cd_df.to_csv(cd_path, index=False)
+    save_dataset(hy_savings_df, hy_savings_path)
+    save_dataset(cd_df, cd_path)
 
     # print(f"\nHY Savings data saved to: {hy_savings_path}")
     # print(f"CD data saved to: {cd_path}")
@@ -1,69 +1,914 @@
 import pandas as pd
+import numpy as np
+import json
 import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
 
+from assets import MARKET_ASSETS, get_asset_file
+
+# Parquet support is optional: without pyarrow the loaders read the CSV files
+# and save_dataset only writes CSV.
+try:
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# numba ships in requirements.txt, so the metrics kernel is compiled in
+# production; without it (e.g. a bare dev install) the NumPy version is used.
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+# Process-wide cache of parsed dataset frames, keyed by file path and mtime.
+# Every Streamlit rerun goes through the loaders below, so a hit here means a
+# slider change costs a stat() instead of a CSV parse.
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Price dtype of compact frames (see compact_frame)
+COMPACT_DTYPE = os.getenv("DATASET_COMPACT_DTYPE", "float32")
+PRICE_COLUMNS = ('Adj Close', 'Close')
+# Most memory one asset's compact frame may take (checked by memory_budget);
+# ten years of daily prices take about 45 KiB as float32
+COMPACT_ASSET_MAX_BYTES = int(os.getenv("COMPACT_ASSET_MAX_BYTES", 256 * 1024))
+
+# Parquet files are written in row groups of about a year of trading days,
+# so a date-range read only decodes the groups that overlap the range. CSV
+# files are read in chunks and the read stops after the last wanted date.
+PARQUET_ROW_GROUP_ROWS = 256
+CSV_CHUNK_ROWS = 512
+
+# Rows per block for the streaming readers (iter_asset_chunks)
+STREAM_CHUNK_ROWS = int(os.getenv("DATASET_STREAM_CHUNK_ROWS", 65536))
+
+_dataset_cache = OrderedDict()
+_dataset_cache_bytes = 0
+_dataset_cache_lock = threading.Lock()
+
+
+def _iter_csv_chunks(path: str, usecols, start, end, chunk_rows: int = CSV_CHUNK_ROWS):
+    """
+    Yield the rows of a date-sorted CSV between start and end in chunks,
+    stopping after end. Raises ValueError if the file is not in date order.
+    """
+    last = None
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+        chunk['Date'] = pd.to_datetime(chunk['Date'])
+        if not chunk['Date'].is_monotonic_increasing or (last is not None and chunk['Date'].iloc[0] < last):
+            raise ValueError(f"{path} is not in date order")
+        last = chunk['Date'].iloc[-1]
+
+        if start is not None:
+            chunk = chunk[chunk['Date'] >= start]
+        if end is not None:
+            past_end = chunk['Date'] > end
+            yield chunk[~past_end]
+            if past_end.any():
+                break
+        else:
+            yield chunk
+
+
+def _iter_parquet_chunks(path: str, columns, start, end, chunk_rows: int):
+    """Yield the rows of a Parquet file between start and end in batches, skipping row groups outside the range"""
+    parquet_file = pq.ParquetFile(path)
+    names = parquet_file.schema_arrow.names
+    wanted = None if columns is None else [c for c in names if c == 'Date' or c in columns]
+
+    date_column = names.index('Date')
+    row_groups = []
+    for i in range(parquet_file.num_row_groups):
+        stats = parquet_file.metadata.row_group(i).column(date_column).statistics
+        if stats is not None and stats.has_min_max:
+            if (start is not None and pd.Timestamp(stats.max) < start) or (end is not None and pd.Timestamp(stats.min) > end):
+                continue
+        row_groups.append(i)
+    if not row_groups:
+        return
+
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, row_groups=row_groups, columns=wanted):
+        chunk = batch.to_pandas()
+        if start is not None:
+            chunk = chunk[chunk['Date'] >= start]
+        if end is not None:
+            chunk = chunk[chunk['Date'] <= end]
+        if len(chunk):
+            yield chunk
+
+
+def _read_csv_window(path: str, usecols, start, end) -> pd.DataFrame:
+    """Read the rows of a CSV between start and end, stopping at end when the file is date-sorted"""
+    try:
+        chunks = list(_iter_csv_chunks(path, usecols, start, end))
+    except ValueError:
+        # Not written in date order, so stopping early is unsafe
+        df = pd.read_csv(path, usecols=usecols)
+        df['Date'] = pd.to_datetime(df['Date'])
+        mask = (df['Date'] >= start if start is not None else True) & (df['Date'] <= end if end is not None else True)
+        return df[mask]
+
+    if not chunks:
+        return pd.DataFrame({'Date': pd.to_datetime([])})
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _parse_dataset(path: str, columns: tuple = None, start=None, end=None) -> pd.DataFrame:
+    """
+    Read a dataset file, pushing the column projection and date range into the reader.
+
+    Args:
+        path: CSV or Parquet dataset file
+        columns: Columns to keep besides Date (None keeps all); names missing
+            from the file are ignored
+        start: First Timestamp to keep (optional)
+        end: Last Timestamp to keep (optional)
+    """
+    if path.endswith('.parquet'):
+        wanted = None
+        if columns is not None:
+            wanted = [c for c in pq.read_schema(path).names if c == 'Date' or c in columns]
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', start))
+        if end is not None:
+            filters.append(('Date', '<=', end))
+        # Written by save_dataset with a datetime64 Date column, already sorted
+        df = pd.read_parquet(path, columns=wanted, filters=filters or None)
+    else:
+        usecols = None if columns is None else (lambda c: c == 'Date' or c in columns)
+        if start is None and end is None:
+            df = pd.read_csv(path, usecols=usecols)
+            df['Date'] = pd.to_datetime(df['Date'])
+        else:
+            df = _read_csv_window(path, usecols, start, end)
+    if not df['Date'].is_monotonic_increasing:
+        df = df.sort_values('Date')
+
+    # Date-indexed so filter_by_date_range can binary-search it. The index is
+    # left unnamed; naming it 'Date' would clash with the Date column.
+    df.index = pd.DatetimeIndex(df['Date'].values)
+    return df
+
+
+def compact_frame(df: pd.DataFrame, dtype: str = COMPACT_DTYPE, keep_ticker: bool = False) -> pd.DataFrame:
+    """
+    Reduce a dataset frame to its price column on a datetime64 index.
+
+    Args:
+        df: DataFrame with a Date column and an 'Adj Close' or 'Close' column
+        dtype: 'float32' or 'float64' for the price column
+        keep_ticker: Keep the Ticker column as a categorical instead of dropping it
+
+    Returns:
+        DataFrame indexed by Date with the price column (same name as in df)
+        and, optionally, Ticker
+    """
+    price_column = _price_column(df)
+    columns = {price_column: df[price_column].to_numpy(dtype=dtype)}
+    if keep_ticker and 'Ticker' in df.columns:
+        columns['Ticker'] = pd.Categorical(df['Ticker'])
+
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(df['Date'].values, name='Date'))
+
+
+def _read_dataset(filepath: str, compact: bool = False, dtype: str = COMPACT_DTYPE, columns=None,
+                  start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Read and parse a dataset file, serving repeated reads from the LRU cache.
+
+    Each combination of projection and date range is cached separately, so
+    processes that only read compact frames or short windows never hold the
+    full ones; a window of an already cached whole-file read is sliced from
+    it instead of touching the disk. The returned frame is shared between
+    callers and must be treated as read-only (filter_by_date_range and
+    calculate_returns both copy).
+    """
+    global _dataset_cache_bytes
+
+    path = os.path.abspath(filepath)
+    keep_ticker = False
+    if compact:
+        keep_ticker = columns is not None and 'Ticker' in columns
+        columns = PRICE_COLUMNS + (('Ticker',) if keep_ticker else ())
+    columns = tuple(sorted(columns)) if columns is not None else None
+    start = pd.to_datetime(start_date) if start_date else None
+    end = pd.to_datetime(end_date) if end_date else None
+
+    projection = (path, dtype if compact else None, columns)
+    key = projection + (start, end)
+    mtime = os.path.getmtime(path)
+
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(key)
+        if entry is not None and entry[0] == mtime:
+            _dataset_cache.move_to_end(key)
+            return entry[1]
+
+        whole = _dataset_cache.get(projection + (None, None))
+        if whole is not None and whole[0] == mtime:
+            _dataset_cache.move_to_end(projection + (None, None))
+            return filter_by_date_range(whole[1], start, end)
+
+    df = _parse_dataset(path, columns, start, end)
+    if compact:
+        df = compact_frame(df, dtype, keep_ticker)
+
+    size = int(df.memory_usage(deep=True).sum())
+
+    with _dataset_cache_lock:
+        old = _dataset_cache.pop(key, None)
+        if old is not None:
+            _dataset_cache_bytes -= old[2]
+
+        # Frames larger than the whole budget are returned but never cached
+        if size <= DATASET_CACHE_MAX_BYTES:
+            _dataset_cache[key] = (mtime, df, size)
+            _dataset_cache_bytes += size
+
+            while _dataset_cache_bytes > DATASET_CACHE_MAX_BYTES:
+                _, (_, _, evicted_size) = _dataset_cache.popitem(last=False)
+                _dataset_cache_bytes -= evicted_size
+
+    return df
+
+
+def clear_dataset_cache():
+    """Drop every cached dataset frame"""
+    global _dataset_cache_bytes
+
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+        _dataset_cache_bytes = 0
+
+
+def dataset_cache_info() -> dict:
+    """Return the number of cached frames and the memory they hold"""
+    with _dataset_cache_lock:
+        return {
+            'entries': len(_dataset_cache),
+            'bytes': _dataset_cache_bytes,
+            'max_bytes': DATASET_CACHE_MAX_BYTES,
+        }
+
+
+# Versioned dataset snapshots. publish_datasets() writes new files under
+# snapshots/<version>/ and then atomically swaps manifest.json to point at
+# them, so files are never rewritten in place. Loaders resolve names through
+# the manifest (one stat() per load to notice a new one), which lets running
+# processes pick up a publish without a restart. Names missing from the
+# manifest fall back to the seed CSV/Parquet files in the dataset directory.
+DATASET_MANIFEST_FILE = "manifest.json"
+DATASET_SNAPSHOT_DIR = "snapshots"
+DATASET_SNAPSHOT_KEEP = int(os.getenv("DATASET_SNAPSHOT_KEEP", 3))
+
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+# Serializes manifest updates within a process; run one publisher per dataset dir
+_publish_lock = threading.Lock()
+
+
+def _new_version() -> str:
+    # Sortable by time, unique per process
+    now = time.time_ns()
+    return time.strftime('%Y%m%dT%H%M%S', time.gmtime(now // 10**9)) + f".{now % 10**9:09d}-{os.getpid()}"
+
+
+def _tmp_path(path: str) -> str:
+    # Unique per process and thread, so concurrent writers never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def load_manifest(dataset_dir: str = "./dataset") -> dict:
+    """
+    Return the dataset manifest ({} when nothing has been published).
+
+    The parsed manifest is cached and re-read when the file is replaced.
+    Cached frames of snapshots the new manifest no longer references are
+    dropped at the same time.
+    """
+    path = os.path.abspath(os.path.join(dataset_dir, DATASET_MANIFEST_FILE))
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    stamp = (stat.st_mtime_ns, stat.st_ino)
+
+    with _manifest_lock:
+        entry = _manifest_cache.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        with open(path) as f:
+            manifest = json.load(f)
+        _manifest_cache[path] = (stamp, manifest)
+
+    _evict_superseded(os.path.dirname(path), manifest.get('files', {}))
+
+    return manifest
+
+
+def _evict_superseded(dataset_dir: str, files: dict):
+    """Drop cached frames of old snapshots and of seed files the manifest overrides"""
+    global _dataset_cache_bytes
+
+    snapshot_root = os.path.join(dataset_dir, DATASET_SNAPSHOT_DIR) + os.sep
+    current = {os.path.join(dataset_dir, snapshot) for snapshot in files.values()}
+    seeds = set()
+    for filename in files:
+        seeds.add(os.path.join(dataset_dir, filename))
+        seeds.add(os.path.join(dataset_dir, os.path.splitext(filename)[0] + '.parquet'))
+
+    with _dataset_cache_lock:
+        for key in list(_dataset_cache):
+            path = key[0]
+            if path in seeds or (path.startswith(snapshot_root) and path not in current):
+                _dataset_cache_bytes -= _dataset_cache.pop(key)[2]
+
+
+def _find_seed_dataset(dataset_dir: str, filename: str):
+    """
+    Resolve a dataset CSV filename to the seed file in dataset_dir.
+
+    The Parquet sibling (same name, .parquet extension) is preferred when it
+    exists and is at least as new as the CSV; a CSV edited after the last
+    conversion wins. Returns None when neither file exists.
+    """
+    csv_path = os.path.join(dataset_dir, filename)
+    parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+
+    csv_mtime = os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+
+    if HAS_PARQUET and os.path.exists(parquet_path):
+        if csv_mtime is None or os.path.getmtime(parquet_path) >= csv_mtime:
+            return parquet_path
+
+    return csv_path if csv_mtime is not None else None
+
+
+def _find_dataset(dataset_dir: str, filename: str):
+    """
+    Resolve a dataset CSV filename to the file that should actually be read:
+    the published snapshot if the manifest lists one, else the seed file.
+    Returns None when neither exists.
+    """
+    snapshot = load_manifest(dataset_dir).get('files', {}).get(filename)
+    if snapshot is not None:
+        path = os.path.join(dataset_dir, snapshot)
+        if os.path.exists(path):
+            return path
+
+    return _find_seed_dataset(dataset_dir, filename)
+
+
+def publish_datasets(frames: dict, dataset_dir: str = "./dataset") -> str:
+    """
+    Publish new versions of one or more datasets as a single snapshot.
+
+    The files are written under snapshots/<version>/ and become visible all
+    at once when manifest.json is swapped in. Snapshots older than the newest
+    DATASET_SNAPSHOT_KEEP that the manifest no longer references are deleted.
+
+    Args:
+        frames: Dictionary mapping dataset filename (e.g., 'spy.csv') to a
+            DataFrame with a Date column
+        dataset_dir: Directory holding the datasets
+
+    Returns:
+        The snapshot version
+    """
+    with _publish_lock:
+        version = _new_version()
+        relative_dir = os.path.join(DATASET_SNAPSHOT_DIR, version)
+        os.makedirs(os.path.join(dataset_dir, relative_dir))
+
+        # Nothing references the new directory yet, so the files can be written directly
+        files = {}
+        for filename, df in frames.items():
+            stem = os.path.splitext(filename)[0]
+            if HAS_PARQUET:
+                df = df.copy()
+                df['Date'] = pd.to_datetime(df['Date'])
+                files[filename] = os.path.join(relative_dir, stem + '.parquet')
+                df.to_parquet(os.path.join(dataset_dir, files[filename]), index=False,
+                              row_group_size=PARQUET_ROW_GROUP_ROWS)
+            else:
+                files[filename] = os.path.join(relative_dir, stem + '.csv')
+                df.to_csv(os.path.join(dataset_dir, files[filename]), index=False)
+
+        manifest = {
+            'version': version,
+            'files': {**load_manifest(dataset_dir).get('files', {}), **files},
+        }
+        manifest_path = os.path.join(dataset_dir, DATASET_MANIFEST_FILE)
+        with open(_tmp_path(manifest_path), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(_tmp_path(manifest_path), manifest_path)
+
+        _prune_snapshots(dataset_dir, manifest)
+
+    return version
+
+
+def _prune_snapshots(dataset_dir: str, manifest: dict):
+    snapshot_root = os.path.join(dataset_dir, DATASET_SNAPSHOT_DIR)
+    referenced = {os.path.basename(os.path.dirname(path)) for path in manifest['files'].values()}
+    versions = sorted(os.listdir(snapshot_root))
+
+    for version in versions[:-DATASET_SNAPSHOT_KEEP] if DATASET_SNAPSHOT_KEEP > 0 else versions:
+        if version not in referenced:
+            shutil.rmtree(os.path.join(snapshot_root, version), ignore_errors=True)
+
+
+def save_dataset(df: pd.DataFrame, filepath: str):
+    """
+    Publish a new version of one dataset (see publish_datasets).
+
+    Args:
+        df: DataFrame with a Date column
+        filepath: Path of the dataset CSV; its directory is the dataset directory
+            and its filename the name loaders look up
+    """
+    publish_datasets({os.path.basename(filepath): df}, os.path.dirname(filepath) or ".")
+
+
+def convert_dataset_dir(dataset_dir: str = "./dataset") -> int:
+    """
+    Write a Parquet copy of every seed CSV in dataset_dir that lacks an up-to-date one.
+
+    Returns:
+        Number of files converted
+    """
+    if not HAS_PARQUET:
+        raise ImportError("pyarrow is required to write Parquet datasets")
+
+    converted = 0
+    for filename in sorted(os.listdir(dataset_dir)):
+        if not filename.endswith('.csv'):
+            continue
+
+        if _find_seed_dataset(dataset_dir, filename).endswith('.parquet'):
+            continue
+
+        df = pd.read_csv(os.path.join(dataset_dir, filename))
+        df['Date'] = pd.to_datetime(df['Date'])
+        df = df.sort_values('Date')
+        df.to_parquet(os.path.join(dataset_dir, os.path.splitext(filename)[0] + '.parquet'), index=False,
+                      row_group_size=PARQUET_ROW_GROUP_ROWS)
+        converted += 1
+
+    return converted
+
+
+def _asset_filenames(ticker: str, asset_type: str) -> list:
+    """Dataset filenames to try for an asset, in order: the catalog's file, then the naming patterns"""
+    catalog_file = get_asset_file(ticker)
+    if asset_type == 'crypto':
+        return [catalog_file or f"crypto_{ticker.lower()}.csv"]
+    elif asset_type == 'index':
+        return [catalog_file or f"index_{ticker.lower()}.csv"]
+    elif asset_type == 'fixed_income':
+        return [catalog_file or f"df_{ticker.lower()}.csv"]
 
-def load_etf_data(ticker: str, dataset_dir: str = "./dataset") -> pd.DataFrame:
-    """Load ETF data - tries multiple filename patterns for compatibility"""
     patterns = [
         f"{ticker.lower()}.csv",      # New pattern: spy.csv, qqq.csv
         f"df_{ticker.lower()}.csv",   # Legacy pattern: df_voo.csv
     ]
+    if catalog_file:
+        patterns.insert(0, catalog_file)
+    return patterns
+
+
+def _load_dataset(dataset_dir: str, filename: str, compact: bool = False, dtype: str = COMPACT_DTYPE,
+                  columns=None, start_date=None, end_date=None):
+    """
+    Resolve a dataset filename through the manifest and read it (see _read_dataset).
+
+    A publish can prune the snapshot between resolving and reading it; the
+    name is then resolved again, which finds the snapshot that replaced it.
+    Returns None when no file exists for the name.
+    """
+    filepath = _find_dataset(dataset_dir, filename)
+    if filepath is None:
+        return None
+
+    try:
+        return _read_dataset(filepath, compact, dtype, columns, start_date, end_date)
+    except FileNotFoundError:
+        filepath = _find_dataset(dataset_dir, filename)
+        if filepath is None:
+            return None
+        return _read_dataset(filepath, compact, dtype, columns, start_date, end_date)
+
+
+def load_etf_data(ticker: str, dataset_dir: str = "./dataset", compact: bool = False,
+                  dtype: str = COMPACT_DTYPE, columns: list = None, start_date=None,
+                  end_date=None) -> pd.DataFrame:
+    """Load ETF data - the catalog's file, else multiple filename patterns for compatibility"""
+    patterns = _asset_filenames(ticker, 'etf')
 
     for filename in patterns:
-        filepath = os.path.join(dataset_dir, filename)
-        if os.path.exists(filepath):
-            df = pd.read_csv(filepath)
-            df['Date'] = pd.to_datetime(df['Date'])
-            df = df.sort_values('Date')
+        df = _load_dataset(dataset_dir, filename, compact, dtype, columns, start_date, end_date)
+        if df is not None:
             return df
 
     raise FileNotFoundError(f"Data file not found for {ticker}. Tried: {patterns}")
 
 
-def load_index_data(index_symbol: str, dataset_dir: str = "./dataset") -> pd.DataFrame:
-    filename = f"index_{index_symbol.lower()}.csv"
-    filepath = os.path.join(dataset_dir, filename)
+def load_index_data(index_symbol: str, dataset_dir: str = "./dataset", compact: bool = False,
+                    dtype: str = COMPACT_DTYPE, columns: list = None, start_date=None,
+                    end_date=None) -> pd.DataFrame:
+    filename = _asset_filenames(index_symbol, 'index')[0]
+    df = _load_dataset(dataset_dir, filename, compact, dtype, columns, start_date, end_date)
     
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Data file not found: {filepath}")
-    
-    df = pd.read_csv(filepath)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
+    if df is None:
+        raise FileNotFoundError(f"Data file not found: {os.path.join(dataset_dir, filename)}")
     
     return df
 
 
-def load_crypto_data(crypto_symbol: str, dataset_dir: str = "./dataset") -> pd.DataFrame:
+def load_crypto_data(crypto_symbol: str, dataset_dir: str = "./dataset", compact: bool = False,
+                     dtype: str = COMPACT_DTYPE, columns: list = None, start_date=None,
+                     end_date=None) -> pd.DataFrame:
     """Load crypto data - supports symbols like BTC, ETH, SOL, etc."""
-    filename = f"crypto_{crypto_symbol.lower()}.csv"
-    filepath = os.path.join(dataset_dir, filename)
-
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Data file not found: {filepath}")
+    filename = _asset_filenames(crypto_symbol, 'crypto')[0]
+    df = _load_dataset(dataset_dir, filename, compact, dtype, columns, start_date, end_date)
 
-    df = pd.read_csv(filepath)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
+    if df is None:
+        raise FileNotFoundError(f"Data file not found: {os.path.join(dataset_dir, filename)}")
 
     return df
 
 
-def load_fixed_income_data(product_type: str, dataset_dir: str = "./dataset") -> pd.DataFrame:
+def load_fixed_income_data(product_type: str, dataset_dir: str = "./dataset", compact: bool = False,
+                           dtype: str = COMPACT_DTYPE, columns: list = None, start_date=None,
+                           end_date=None) -> pd.DataFrame:
     #Loads fixed-income product data from CSV file (HY Savings, CD).
-    filename = f"df_{product_type.lower()}.csv"
-    filepath = os.path.join(dataset_dir, filename)
+    filename = _asset_filenames(product_type, 'fixed_income')[0]
+    df = _load_dataset(dataset_dir, filename, compact, dtype, columns, start_date, end_date)
 
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Data file not found: {filepath}")
-
-    df = pd.read_csv(filepath)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
+    if df is None:
+        raise FileNotFoundError(f"Data file not found: {os.path.join(dataset_dir, filename)}")
 
     return df
 
 
+def load_asset_data(ticker: str, asset_type: str, dataset_dir: str = "./dataset", compact: bool = False,
+                    dtype: str = COMPACT_DTYPE, columns: list = None, start_date=None,
+                    end_date=None) -> pd.DataFrame:
+    """
+    Load data for any asset type ('etf', 'crypto', 'index' or 'fixed_income')
+
+    With compact=True only the price column is returned, as dtype on a Date
+    index (see compact_frame), plus Ticker as a categorical if columns
+    lists it; otherwise the dataset frame with the Date column and, if
+    given, only the listed columns. start_date and end_date
+    (both inclusive) are pushed into the reader, so only that window is read.
+    """
+    if asset_type == 'crypto':
+        return load_crypto_data(ticker, dataset_dir, compact, dtype, columns, start_date, end_date)
+    elif asset_type == 'index':
+        return load_index_data(ticker, dataset_dir, compact, dtype, columns, start_date, end_date)
+    elif asset_type == 'fixed_income':
+        return load_fixed_income_data(ticker, dataset_dir, compact, dtype, columns, start_date, end_date)
+    else:
+        return load_etf_data(ticker, dataset_dir, compact, dtype, columns, start_date, end_date)
+
+
+def find_asset_dataset(ticker: str, asset_type: str, dataset_dir: str = "./dataset"):
+    """Path of the file an asset is currently read from (snapshot or seed), or None if it has none"""
+    for filename in _asset_filenames(ticker, asset_type):
+        filepath = _find_dataset(dataset_dir, filename)
+        if filepath is not None:
+            return filepath
+    return None
+
+
+def iter_asset_chunks(ticker: str, asset_type: str, dataset_dir: str = "./dataset", chunk_rows: int = STREAM_CHUNK_ROWS,
+                      columns: list = None, start_date=None, end_date=None):
+    """
+    Stream an asset's dataset in date order without loading it whole.
+
+    Bypasses the dataset cache, so memory stays bounded by chunk_rows
+    however long the history is. The file must be in date order.
+
+    Args:
+        ticker: Asset ticker
+        asset_type: 'etf', 'crypto', 'index' or 'fixed_income'
+        dataset_dir: Directory holding the datasets
+        chunk_rows: Maximum rows per chunk
+        columns: Columns to keep besides Date (None keeps all)
+        start_date: First date to include (optional)
+        end_date: Last date to include (optional)
+
+    Yields:
+        DataFrames with a Date column, oldest rows first
+    """
+    start = pd.to_datetime(start_date) if start_date else None
+    end = pd.to_datetime(end_date) if end_date else None
+
+    filepath = find_asset_dataset(ticker, asset_type, dataset_dir)
+    if filepath is None:
+        raise FileNotFoundError(f"Data file not found for {ticker}. Tried: {_asset_filenames(ticker, asset_type)}")
+
+    if filepath.endswith('.parquet'):
+        yield from _iter_parquet_chunks(filepath, columns, start, end, chunk_rows)
+    else:
+        usecols = None if columns is None else (lambda c: c == 'Date' or c in columns)
+        for chunk in _iter_csv_chunks(filepath, usecols, start, end, chunk_rows):
+            if len(chunk):
+                yield chunk
+
+
+def memory_budget(assets: dict, dataset_dir: str = "./dataset", dtype: str = COMPACT_DTYPE,
+                  max_bytes: int = COMPACT_ASSET_MAX_BYTES) -> dict:
+    """
+    Measure the in-memory size of each asset's full and compact frames,
+    and check the compact ones against the per-asset budget.
+
+    Args:
+        assets: Dictionary mapping ticker to asset type (see load_asset_data)
+        dataset_dir: Directory holding the datasets
+        dtype: Price dtype of the compact frames
+        max_bytes: Budget for one compact frame (None to only measure)
+
+    Returns:
+        Dictionary mapping ticker to rows, full_bytes and compact_bytes
+
+    Raises:
+        ValueError: If a compact frame is larger than max_bytes
+    """
+    budget = {}
+    for ticker, asset_type in assets.items():
+        full = load_asset_data(ticker, asset_type, dataset_dir)
+        compact = compact_frame(full, dtype)
+        budget[ticker] = {
+            'rows': len(full),
+            'full_bytes': int(full.memory_usage(deep=True).sum()),
+            'compact_bytes': int(compact.memory_usage(deep=True).sum()),
+        }
+
+    over = {ticker: sizes['compact_bytes'] for ticker, sizes in budget.items()
+            if max_bytes is not None and sizes['compact_bytes'] > max_bytes}
+    if over:
+        raise ValueError(f"Compact frames over the {max_bytes} byte budget: {over}")
+
+    return budget
+
+
+# Unified price matrix: every asset's price on one shared date axis, stored as
+# a memory-mapped .npy so all worker processes share one page-cached copy.
+# Each build is written to its own price_matrix/<version>/ directory and
+# published by swapping price_matrix.json, which names the version, so a
+# reader always opens a values/dates pair from the same build.
+PRICE_MATRIX_DIR = "price_matrix"
+PRICE_MATRIX_FILE = "values.npy"
+PRICE_MATRIX_DATES_FILE = "dates.npy"
+PRICE_MATRIX_INDEX_FILE = "price_matrix.json"
+# Superseded builds kept for readers that resolved them just before a swap
+PRICE_MATRIX_KEEP = 2
+
+_price_matrix_cache = {}
+_price_matrix_lock = threading.Lock()
+
+
+class PriceMatrix:
+    """
+    Date-aligned prices for many assets (rows are dates, columns are tickers).
+
+    Cells are NaN where an asset has no row for that date (before listing,
+    weekends for ETFs). Values are stored column-major, so column() returns a
+    contiguous zero-copy view.
+    """
+
+    def __init__(self, dates: np.ndarray, tickers: list, values: np.ndarray, missing: list = ()):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.values = values
+        # Requested tickers left out because their dataset could not be loaded
+        self.missing = list(missing)
+        self._columns = {ticker: idx for idx, ticker in enumerate(self.tickers)}
+        self.built_at = None
+        # Dataset manifest version the matrix was built from (None before the first publish)
+        self.dataset_version = None
+
+    def __contains__(self, ticker):
+        return ticker in self._columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    def column_index(self, ticker: str) -> int:
+        return self._columns[ticker]
+
+    def column(self, ticker: str) -> np.ndarray:
+        """Zero-copy view of one ticker's prices over the full date axis"""
+        return self.values[:, self._columns[ticker]]
+
+    def with_columns(self, frames: dict) -> 'PriceMatrix':
+        """
+        Return an in-memory copy of the matrix with extra assets added.
+
+        Args:
+            frames: Dictionary mapping ticker to a DataFrame with Date and a
+                price column; existing tickers with the same name are replaced
+        """
+        dates = pd.DatetimeIndex(self.dates)
+        merged = {
+            ticker: pd.DataFrame({'Date': dates, 'Close': self.column(ticker)})
+            for ticker in self.tickers if ticker not in frames
+        }
+        merged.update(frames)
+
+        missing = [ticker for ticker in self.missing if ticker not in frames]
+        return PriceMatrix(*_align_frames(merged, self.values.dtype.name), missing)
+
+    def to_frame(self, ticker: str) -> pd.DataFrame:
+        """Copy one ticker's observed rows out as a Date/Close DataFrame"""
+        prices = self.column(ticker)
+        observed = ~np.isnan(prices)
+        return pd.DataFrame({
+            'Date': pd.to_datetime(self.dates[observed]),
+            'Close': np.asarray(prices[observed], dtype=np.float64),
+        })
+
+
+def _price_column(df: pd.DataFrame) -> str:
+    return 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+
+
+def _align_frames(frames: dict, dtype: str = "float64"):
+    """Align the price column of each frame on the union of their dates"""
+    series = {}
+    for ticker, df in frames.items():
+        # Compact frames are already Date-indexed
+        prices = df[_price_column(df)] if 'Date' not in df.columns else df.set_index('Date')[_price_column(df)]
+        series[ticker] = prices[~prices.index.duplicated(keep='last')]
+
+    aligned = pd.DataFrame(series).sort_index()
+    dates = aligned.index.values.astype('datetime64[D]')
+    values = np.asfortranarray(aligned.to_numpy(dtype=dtype))
+    return dates, list(aligned.columns), values
+
+
+def build_price_matrix(assets: dict = None, dataset_dir: str = "./dataset", dtype: str = "float64") -> PriceMatrix:
+    """
+    Pack the price history of every asset into one date-aligned matrix on disk.
+
+    Args:
+        assets: Dictionary mapping ticker to asset type (see load_asset_data),
+            defaults to every market asset in the catalog
+        dataset_dir: Directory holding the per-asset datasets
+        dtype: 'float64' or 'float32'
+
+    Returns:
+        The PriceMatrix that was written; assets whose dataset is missing are
+        left out and listed in its missing attribute
+    """
+    # Read before the datasets, so a publish during the build leaves the matrix stale
+    dataset_version = load_manifest(dataset_dir).get('version')
+
+    frames = {}
+    missing = []
+    for ticker, asset_type in (assets or MARKET_ASSETS).items():
+        try:
+            frames[ticker] = load_asset_data(ticker, asset_type, dataset_dir, compact=True, dtype=dtype)
+        except FileNotFoundError as e:
+            print(f"Price matrix: skipping {ticker}: {str(e)}")
+            missing.append(ticker)
+    dates, tickers, values = _align_frames(frames, dtype)
+
+    version = _new_version()
+    root = os.path.join(dataset_dir, PRICE_MATRIX_DIR)
+    os.makedirs(os.path.join(root, version))
+
+    # Nothing references the new directory until the index is swapped in
+    np.save(os.path.join(root, version, PRICE_MATRIX_FILE), values)
+    np.save(os.path.join(root, version, PRICE_MATRIX_DATES_FILE), dates)
+
+    index = {
+        'version': version,
+        'tickers': tickers,
+        'missing': missing,
+        'dtype': dtype,
+        'rows': len(dates),
+        'dataset_version': dataset_version,
+    }
+    index_path = os.path.join(dataset_dir, PRICE_MATRIX_INDEX_FILE)
+    with open(_tmp_path(index_path), 'w') as f:
+        json.dump(index, f)
+    os.replace(_tmp_path(index_path), index_path)
+
+    _prune_price_matrices(root, version)
+
+    matrix = PriceMatrix(dates, tickers, values, missing)
+    matrix.dataset_version = dataset_version
+    return matrix
+
+
+def _prune_price_matrices(root: str, current: str):
+    # Builds newer than ours belong to concurrent builders and are left alone
+    older = sorted(version for version in os.listdir(root) if version < current)
+    for version in older[:-PRICE_MATRIX_KEEP] if PRICE_MATRIX_KEEP > 0 else older:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def _open_price_matrix(dataset_dir: str, index_path: str) -> PriceMatrix:
+    with open(index_path) as f:
+        index = json.load(f)
+
+    build_dir = os.path.join(dataset_dir, PRICE_MATRIX_DIR, index['version'])
+    values = np.load(os.path.join(build_dir, PRICE_MATRIX_FILE), mmap_mode='r')
+    dates = np.load(os.path.join(build_dir, PRICE_MATRIX_DATES_FILE))
+
+    if values.shape != (index['rows'], len(index['tickers'])) or len(dates) != index['rows']:
+        raise FileNotFoundError(f"Price matrix in {build_dir} is incomplete, rebuild it")
+
+    matrix = PriceMatrix(dates, index['tickers'], values, index.get('missing', []))
+    matrix.dataset_version = index.get('dataset_version')
+    return matrix
+
+
+def load_price_matrix(dataset_dir: str = "./dataset") -> PriceMatrix:
+    """
+    Memory-map the price matrix written by build_price_matrix.
+
+    The mapping is cached per process and reopened when the index file
+    changes. Raises FileNotFoundError if no (complete) matrix exists.
+    """
+    index_path = os.path.abspath(os.path.join(dataset_dir, PRICE_MATRIX_INDEX_FILE))
+
+    with _price_matrix_lock:
+        # A build pruned between reading the index and opening its files means
+        # a newer index was swapped in meanwhile, so read it once more
+        for attempt in range(2):
+            try:
+                stat = os.stat(index_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Price matrix not found: {index_path}")
+            stamp = (stat.st_mtime_ns, stat.st_ino)
+
+            entry = _price_matrix_cache.get(index_path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+            try:
+                matrix = _open_price_matrix(dataset_dir, index_path)
+                break
+            except (FileNotFoundError, KeyError):
+                if attempt:
+                    raise FileNotFoundError(f"Price matrix in {dataset_dir} is incomplete, rebuild it")
+
+        matrix.built_at = stat.st_mtime
+        _price_matrix_cache[index_path] = (stamp, matrix)
+
+    return matrix
+
+
+def _price_matrix_stale(matrix: PriceMatrix, dataset_dir: str) -> bool:
+    """
+    True if the datasets changed after the matrix was built.
+
+    Once datasets are published through the manifest, its version is all
+    that needs checking: seed files only change on a redeploy, and the
+    container entrypoint drops the matrix index when it updates them.
+    Before the first publish, any seed file newer than the matrix counts.
+    """
+    version = load_manifest(dataset_dir).get('version')
+    if version is not None:
+        return version != matrix.dataset_version
+
+    for filename in os.listdir(dataset_dir):
+        if filename.endswith(('.csv', '.parquet')):
+            if os.path.getmtime(os.path.join(dataset_dir, filename)) > matrix.built_at:
+                return True
+    return False
+
+
+def get_price_matrix(dataset_dir: str = "./dataset") -> PriceMatrix:
+    """
+    Return the shared price matrix of every market asset in the catalog,
+    building it first if it is missing, lacks a catalog ticker, or is older
+    than the datasets (see _price_matrix_stale). Tickers without a dataset are left out (see
+    PriceMatrix.missing), so one missing file only affects that asset.
+    """
+    try:
+        matrix = load_price_matrix(dataset_dir)
+        covered = set(matrix.tickers) | set(matrix.missing)
+        if all(ticker in covered for ticker in MARKET_ASSETS) and not _price_matrix_stale(matrix, dataset_dir):
+            return matrix
+    except FileNotFoundError:
+        pass
+
+    build_price_matrix(MARKET_ASSETS, dataset_dir)
+    return load_price_matrix(dataset_dir)
+
+
 def calculate_returns(df: pd.DataFrame, initial_investment: float = 10000) -> pd.DataFrame:
     # Calculate investment returns over time.
     df = df.copy()
@@ -85,37 +930,339 @@ def calculate_returns(df: pd.DataFrame, initial_investment: float = 10000) -> pd
     return df
 
 
-def filter_by_date_range(df: pd.DataFrame, start_date: str = None, end_date: str = None) -> pd.DataFrame:
-    df = df.copy()
-    
+def _date_axis(df: pd.DataFrame):
+    """Sorted DatetimeIndex of df's rows, or None if the rows are not in date order"""
+    dates = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.DatetimeIndex(df['Date'])
+    return dates if dates.is_monotonic_increasing else None
+
+
+def filter_by_date_range(df: pd.DataFrame, start_date: str = None, end_date: str = None, asof: bool = False) -> pd.DataFrame:
+    """
+    Return the rows of df between start_date and end_date (both inclusive).
+
+    Date-sorted frames (everything the loaders return) are sliced by binary
+    search without copying, so the result must not be modified in place.
+    Unsorted frames fall back to a filtered copy.
+
+    Args:
+        df: DataFrame with a Date column
+        start_date: First date to keep (optional)
+        end_date: Last date to keep (optional)
+        asof: If True, start from the last row on or before start_date (the
+            nearest earlier trading day) instead of the first row after it
+    """
+    dates = _date_axis(df)
+
+    if dates is None:
+        df = df.copy()
+
+        if start_date:
+            df = df[df['Date'] >= pd.to_datetime(start_date)]
+
+        if end_date:
+            df = df[df['Date'] <= pd.to_datetime(end_date)]
+
+        return df
+
+    start = 0
     if start_date:
-        df = df[df['Date'] >= pd.to_datetime(start_date)]
-    
+        if asof:
+            start = max(dates.searchsorted(pd.to_datetime(start_date), side='right') - 1, 0)
+        else:
+            start = dates.searchsorted(pd.to_datetime(start_date), side='left')
+
+    end = len(dates)
     if end_date:
-        df = df[df['Date'] <= pd.to_datetime(end_date)]
-    
-    return df
+        end = dates.searchsorted(pd.to_datetime(end_date), side='right')
 
+    return df.iloc[start:end]
 
-def get_performance_metrics(df: pd.DataFrame) -> dict:
-    # Calculate performance metrics for an investment.
-    if 'Daily_Return' not in df.columns:
-        df = calculate_returns(df)
 
-    price_column = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+def get_row_asof(df: pd.DataFrame, date):
+    """
+    Return the row for the nearest trading day on or before date.
+
+    Returns:
+        The row as a Series, or None if date is before the first row
+    """
+    dates = _date_axis(df)
+    if dates is None:
+        df = df.sort_values('Date')
+        dates = pd.DatetimeIndex(df['Date'])
+
+    position = dates.searchsorted(pd.to_datetime(date), side='right') - 1
+    if position < 0:
+        return None
+
+    return df.iloc[position]
+
+
+def _performance_loop(prices, threshold):
+    """
+    One pass over a price series: first/last/max/min price, Welford count,
+    mean and M2 of the daily returns, sum of squared returns below
+    threshold, and the maximum drawdown (as a fraction, <= 0). NaN prices
+    are skipped, so a return spans the gap; at least one price must be set.
+    """
+    start = 0
+    while np.isnan(prices[start]):
+        start += 1
+
+    first = prices[start]
+    prev = first
+    max_price = first
+    min_price = first
+    peak = first
+    max_drawdown = 0.0
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    downside = 0.0
+
+    for i in range(start + 1, len(prices)):
+        price = prices[i]
+        if np.isnan(price):
+            continue
+        daily_return = price / prev - 1.0
+        count += 1
+        delta = daily_return - mean
+        mean += delta / count
+        m2 += delta * (daily_return - mean)
+        if daily_return < threshold:
+            downside += (daily_return - threshold) ** 2
+
+        if price > max_price:
+            max_price = price
+        if price < min_price:
+            min_price = price
+        if price > peak:
+            peak = price
+        drawdown = price / peak - 1.0
+        if drawdown < max_drawdown:
+            max_drawdown = drawdown
+        prev = price
+
+    return first, prev, max_price, min_price, count, mean, m2, downside, max_drawdown
+
+
+def _performance_numpy(prices, threshold):
+    """Vectorized equivalent of _performance_loop, for when numba is not installed"""
+    prices = prices[~np.isnan(prices)]
+    returns = prices[1:] / prices[:-1] - 1.0
+    count = len(returns)
+    mean = returns.mean() if count else 0.0
+    m2 = ((returns - mean) ** 2).sum()
+    downside = (np.minimum(returns - threshold, 0.0) ** 2).sum()
+    max_drawdown = min((prices / np.maximum.accumulate(prices) - 1.0).min(), 0.0)
+
+    return prices[0], prices[-1], prices.max(), prices.min(), count, mean, m2, downside, max_drawdown
+
+
+# A plain Python loop is far slower than NumPy, so it is only used compiled
+_performance_kernel = numba.njit(cache=True)(_performance_loop) if HAS_NUMBA else _performance_numpy
 
-    metrics = {
-        'total_return_pct': df['Gain_Loss_Pct'].iloc[-1],
-        'total_return_dollar': df['Gain_Loss'].iloc[-1],
-        'final_value': df['Portfolio_Value'].iloc[-1],
-        'avg_daily_return': df['Daily_Return'].mean() * 100,
-        'volatility': df['Daily_Return'].std() * 100,
-        'max_price': df[price_column].max(),
-        'min_price': df[price_column].min(),
-        'current_price': df[price_column].iloc[-1],
+
+def _summary_metrics(initial_investment, first, last, max_price, min_price, count, mean, m2, downside,
+                     max_drawdown, periods_per_year, years, threshold) -> dict:
+    """Build the get_performance_metrics dictionary from the kernel's aggregates"""
+    final_value = last / first * initial_investment
+    gain_loss = final_value - initial_investment
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+    downside_deviation = np.sqrt(downside / count) if count else np.nan
+    annualization = np.sqrt(periods_per_year) if periods_per_year > 0 else np.nan
+
+    return {
+        'total_return_pct': gain_loss / initial_investment * 100,
+        'total_return_dollar': gain_loss,
+        'final_value': final_value,
+        'avg_daily_return': mean * 100 if count else np.nan,
+        'volatility': std * 100,
+        'max_price': max_price,
+        'min_price': min_price,
+        'current_price': last,
+        'sharpe_ratio': (mean - threshold) / std * annualization if std > 0 else np.nan,
+        'sortino_ratio': (mean - threshold) / downside_deviation * annualization if downside_deviation > 0 else np.nan,
+        'max_drawdown_pct': max_drawdown * 100,
+        'cagr_pct': ((last / first) ** (1 / years) - 1) * 100 if years > 0 else np.nan,
     }
 
-    return metrics
+
+def _period_stats(first_date, last_date, returns: int, risk_free_rate: float):
+    """Years covered, return periods per year and the per-period risk-free return"""
+    years = (pd.Timestamp(last_date) - pd.Timestamp(first_date)).days / 365.25
+    periods_per_year = returns / years if years > 0 else 0.0
+    threshold = (1 + risk_free_rate) ** (1 / periods_per_year) - 1 if periods_per_year > 0 else 0.0
+    return years, periods_per_year, threshold
+
+
+def get_performance_metrics(df: pd.DataFrame, risk_free_rate: float = 0.0) -> dict:
+    """
+    Calculate performance metrics for an investment in a single pass over its prices.
+
+    Args:
+        df: Price DataFrame, raw or from calculate_returns (whose initial
+            investment is then used; otherwise 10000)
+        risk_free_rate: Annual risk-free rate (e.g., 0.04) for the Sharpe and
+            Sortino ratios
+
+    Returns:
+        Dictionary with total_return_pct, total_return_dollar, final_value,
+        avg_daily_return, volatility, max_price, min_price, current_price,
+        and the annualized sharpe_ratio and sortino_ratio, max_drawdown_pct
+        (<= 0) and cagr_pct
+    """
+    prices = df[_price_column(df)].to_numpy(dtype=np.float64)
+    dates = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.DatetimeIndex(df['Date'])
+
+    # Rows without a price are skipped, as the pandas reductions this replaced did
+    observed = ~np.isnan(prices)
+    if not observed.all():
+        prices, dates = prices[observed], dates[observed]
+    if not len(prices):
+        raise ValueError("No prices to compute metrics from")
+    years, periods_per_year, threshold = _period_stats(dates[0], dates[-1], len(prices) - 1, risk_free_rate)
+
+    initial_investment = 10000
+    if 'Portfolio_Value' in df.columns:
+        values = df['Portfolio_Value'].dropna()
+        if len(values):
+            initial_investment = values.iloc[0]
+    return _summary_metrics(initial_investment, *_performance_kernel(prices, threshold),
+                            periods_per_year, years, threshold)
+
+
+class ReturnsStream:
+    """
+    Running version of calculate_returns + get_performance_metrics.
+
+    Consumes price rows block by block and keeps only running state: the
+    first and last price, the running max/min/peak and drawdown, and
+    Welford's count, mean and sum of squared deviations of the daily returns
+    (blocks are merged with Chan's parallel update). Sharpe and Sortino use
+    a zero risk-free rate. With max_points set it also keeps an evenly
+    spaced sample of the Portfolio_Value path: rows are kept at a stride that
+    doubles whenever the sample outgrows max_points, so memory stays bounded
+    by max_points plus one block.
+    """
+
+    def __init__(self, initial_investment: float = 10000, max_points: int = 0):
+        self.initial_investment = initial_investment
+        self.max_points = max_points
+        self.rows = 0
+        self.first_price = None
+        self.first_date = None
+        self.last_price = None
+        self.last_date = None
+        self.max_price = -np.inf
+        self.min_price = np.inf
+        self.max_drawdown = 0.0
+        # Welford state over daily returns
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside = 0.0
+        # Sampled path: global row numbers are multiples of stride
+        self.stride = 1
+        self._path_dates = np.empty(0, dtype='datetime64[ns]')
+        self._path_prices = np.empty(0, dtype=np.float64)
+
+    def update(self, df: pd.DataFrame):
+        """
+        Add the next block of rows.
+
+        Args:
+            df: DataFrame with an 'Adj Close' or 'Close' column and a Date
+                column or Date index, following the previous block in time
+        """
+        prices = df[_price_column(df)].to_numpy(dtype=np.float64)
+        # Skip rows without a price, like get_performance_metrics
+        observed = ~np.isnan(prices)
+        if not observed.all():
+            df, prices = df[observed], prices[observed]
+        if not len(prices):
+            return
+
+        if self.first_price is None:
+            self.first_price = prices[0]
+            returns = prices[1:] / prices[:-1] - 1
+        else:
+            returns = prices / np.concatenate(([self.last_price], prices[:-1])) - 1
+
+        if len(returns):
+            n = len(returns)
+            mean = returns.mean()
+            m2 = ((returns - mean) ** 2).sum()
+            total = self.count + n
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += m2 + delta ** 2 * self.count * n / total
+            self.count = total
+            self.downside += (np.minimum(returns, 0.0) ** 2).sum()
+
+        peaks = np.maximum.accumulate(np.maximum(prices, self.max_price))
+        self.max_drawdown = min(self.max_drawdown, (prices / peaks - 1.0).min())
+        self.max_price = max(self.max_price, prices.max())
+        self.min_price = min(self.min_price, prices.min())
+
+        dates = (df['Date'] if 'Date' in df.columns else df.index).to_numpy(dtype='datetime64[ns]')
+        if self.first_date is None:
+            self.first_date = dates[0]
+        if self.max_points > 0:
+            self._sample(dates, prices)
+
+        self.rows += len(prices)
+        self.last_price = prices[-1]
+        self.last_date = dates[-1]
+
+    def _sample(self, dates: np.ndarray, prices: np.ndarray):
+        offset = (-self.rows) % self.stride
+        self._path_dates = np.concatenate((self._path_dates, dates[offset::self.stride]))
+        self._path_prices = np.concatenate((self._path_prices, prices[offset::self.stride]))
+        while len(self._path_prices) > self.max_points:
+            self._path_dates = self._path_dates[::2]
+            self._path_prices = self._path_prices[::2]
+            self.stride *= 2
+
+    def metrics(self) -> dict:
+        """The get_performance_metrics dictionary for the rows seen so far"""
+        if self.first_price is None:
+            raise ValueError("No price rows were streamed")
+
+        years, periods_per_year, _ = _period_stats(self.first_date, self.last_date, self.count, 0.0)
+        return _summary_metrics(self.initial_investment, self.first_price, self.last_price, self.max_price,
+                                self.min_price, self.count, self.mean, self.m2, self.downside, self.max_drawdown,
+                                periods_per_year, years, 0.0)
+
+    def path(self) -> pd.Series:
+        """Sampled Portfolio_Value path, always ending with the latest row (None without max_points)"""
+        if self.max_points <= 0 or self.first_price is None:
+            return None
+
+        dates, prices = self._path_dates, self._path_prices
+        if dates[-1] != self.last_date:
+            dates = np.append(dates, self.last_date)
+            prices = np.append(prices, self.last_price)
+
+        return pd.Series(prices / self.first_price * self.initial_investment,
+                         index=pd.DatetimeIndex(dates), name='Portfolio_Value')
+
+
+def stream_performance_metrics(chunks, initial_investment: float = 10000, max_points: int = 0):
+    """
+    Compute get_performance_metrics over an iterable of blocks with bounded memory.
+
+    Args:
+        chunks: Iterable of DataFrames in date order, e.g. from iter_asset_chunks
+        initial_investment: Amount invested at the first row
+        max_points: Size of the sampled Portfolio_Value path to return (0 for none)
+
+    Returns:
+        (metrics, path) where path is a Series or None
+    """
+    stream = ReturnsStream(initial_investment, max_points)
+    for chunk in chunks:
+        stream.update(chunk)
+    return stream.metrics(), stream.path()
 
 
 if __name__ == "__main__":
@@ -138,3 +1285,6 @@ if __name__ == "__main__":
     print(f"  Max Price: ${metrics['max_price']:.2f}")
     print(f"  Min Price: ${metrics['min_price']:.2f}")
 
+    budget = memory_budget({'VOO': 'etf'})['VOO']
+    print(f"\nMemory: {budget['full_bytes'] / 1024:.0f} KiB full, "
+          f"{budget['compact_bytes'] / 1024:.0f} KiB compact ({budget['rows']} rows)")
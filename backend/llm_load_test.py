@@ -0,0 +1,140 @@
+"""
+Load test for the LLM endpoint against a local mock completion server.
+
+Usage:
+    # 1. Start a mock OpenAI-compatible completion server (no Groq token used)
+    python llm_load_test.py mock --port 8931 --delay 2.0
+
+    # 2. Point the server under test at it
+    GROQ_TOKEN=test GROQ_BASE_URL=http://127.0.0.1:8931/v1 uvicorn asgi:app --port 5001
+
+    # 3. Fire concurrent chat requests and report latencies
+    python llm_load_test.py run --url http://127.0.0.1:5001 --requests 500 --concurrency 500 --stream
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+MOCK_TOKENS = ["An ", "ETF ", "is ", "a ", "basket ", "of ", "investments ", "that ", "trades ", "like ", "a ", "stock."]
+
+
+def create_mock_app(delay: float) -> Starlette:
+    """OpenAI-compatible /v1/chat/completions that answers after delay seconds"""
+    async def completions(request):
+        body = await request.json()
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return JSONResponse({
+                "id": "mock", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                "system_fingerprint": "mock",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(MOCK_TOKENS)},
+                             "finish_reason": "stop", "logprobs": None}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(MOCK_TOKENS), "total_tokens": len(MOCK_TOKENS)},
+            })
+
+        async def events():
+            for token in MOCK_TOKENS:
+                await asyncio.sleep(delay / len(MOCK_TOKENS))
+                chunk = {
+                    "id": "mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+                    "system_fingerprint": "mock",
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": token},
+                                 "finish_reason": None, "logprobs": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+async def send_request(client: httpx.AsyncClient, url: str, stream: bool, question: str) -> dict:
+    payload = {"messages": [{"role": "user", "content": question}], "context": None, "stream": stream}
+    start = time.perf_counter()
+    first_token = None
+
+    if stream:
+        async with client.stream("POST", f"{url}/api/v1/llm", json=payload) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and first_token is None:
+                    first_token = time.perf_counter() - start
+            status = response.status_code
+    else:
+        response = await client.post(f"{url}/api/v1/llm", json=payload)
+        status = response.status_code
+
+    total = time.perf_counter() - start
+    return {"status": status, "first_token": first_token if first_token is not None else total, "total": total}
+
+
+async def run_load_test(url: str, requests: int, concurrency: int, stream: bool):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        async def bounded(idx):
+            async with semaphore:
+                return await send_request(client, url, stream, f"What is an ETF? ({idx})")
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(idx) for idx in range(requests)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if isinstance(r, dict) and r["status"] == 200]
+    failed = len(results) - len(ok)
+
+    def percentile(values, pct):
+        return sorted(values)[min(int(len(values) * pct / 100), len(values) - 1)]
+
+    print("\n" + "="*80)
+    print("LLM LOAD TEST")
+    print("="*80)
+    print(f"\nTarget: {url}/api/v1/llm ({'streaming' if stream else 'blocking'})")
+    print(f"Requests: {requests} (concurrency {concurrency})")
+    print(f"Succeeded: {len(ok)}, failed: {failed}")
+    print(f"Wall time: {elapsed:.2f}s ({len(ok) / elapsed:.1f} req/s)")
+
+    if ok:
+        for label, key in (("Time to first token", "first_token"), ("Total latency", "total")):
+            values = [r[key] for r in ok]
+            print(f"{label}: median {statistics.median(values):.3f}s, "
+                  f"p95 {percentile(values, 95):.3f}s, max {max(values):.3f}s")
+
+    print("="*80 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LLM endpoint against a mock completion server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    mock = subparsers.add_parser("mock", help="Run a mock OpenAI-compatible completion server")
+    mock.add_argument("--port", type=int, default=8931)
+    mock.add_argument("--delay", type=float, default=2.0, help="Seconds per completion")
+
+    run = subparsers.add_parser("run", help="Send concurrent requests to /api/v1/llm")
+    run.add_argument("--url", default="http://127.0.0.1:5001")
+    run.add_argument("--requests", type=int, default=200)
+    run.add_argument("--concurrency", type=int, default=200)
+    run.add_argument("--stream", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "mock":
+        uvicorn.run(create_mock_app(args.delay), host="127.0.0.1", port=args.port, log_level="warning")
+    else:
+        asyncio.run(run_load_test(args.url, args.requests, args.concurrency, args.stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from assets import GENERATED_ASSETS, get_asset_info
+from generate_fixed_income_data import generate_daily_compound_data
+from get_data import PriceMatrix, get_price_matrix
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset')
+
+# Generated fixed-income series start with the rest of the dataset
+FIXED_INCOME_START_DATE = datetime(2015, 11, 25)
+
+
+# Default point budget for charts of value paths (see downsample_series)
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 500))
+
+
+# Unit-value paths cached per engine, keyed by (ticker, start row). A path is
+# what $1 invested in the asset on the start date is worth over time, so any
+# allocation or investment amount is just a scaling of it.
+UNIT_PATH_CACHE_SIZE = 512
+
+
+def _allocation_error(allocations: dict):
+    """Error message if the positive allocations add up to more than 100%, else None"""
+    total = sum(pct for pct in allocations.values() if pct > 0)
+    if total > 100 + 1e-9:
+        return f"Total allocation is {total:g}%, which exceeds 100%"
+    return None
+
+
+def _held_unit_values(unit_values: np.ndarray) -> np.ndarray:
+    """
+    Back-fill the rows before each asset's first price with its first unit
+    value (1.0), so money allocated to an asset that has not traded yet is
+    held as cash instead of counting as zero. Later gaps are already
+    forward-filled by _compute_unit_paths.
+    """
+    observed = ~np.isnan(unit_values)
+    first = observed.argmax(axis=0)
+    cols = np.arange(unit_values.shape[1])
+    return np.where(np.arange(len(unit_values))[:, None] < first, unit_values[first, cols], unit_values)
+
+
+class PortfolioEngine:
+    """
+    Compute portfolio performance for many assets at once over a PriceMatrix.
+
+    Per-asset unit-value paths and their metrics are computed in one pass of
+    NumPy operations over the (dates x assets) price block and cached, so
+    changing only the allocation or amount rescales cached paths instead of
+    recomputing them.
+    """
+
+    def __init__(self, matrix: PriceMatrix):
+        self.matrix = matrix
+        self._unit_paths = OrderedDict()
+        self._unit_paths_lock = threading.Lock()
+
+    def _forward_fill(self, prices: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        # Row index of the last observation at or before each row, per column
+        rows = np.where(observed, np.arange(len(prices))[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return prices[rows, np.arange(prices.shape[1])]
+
+    def _compute_unit_paths(self, tickers: list, start_row: int) -> dict:
+        """Compute unit-value paths for tickers from start_row in one NumPy pass"""
+        if start_row >= len(self.matrix):
+            return {ticker: None for ticker in tickers}
+
+        columns = [self.matrix.column_index(ticker) for ticker in tickers]
+        prices = np.asarray(self.matrix.values[start_row:, columns], dtype=np.float64)
+        observed = ~np.isnan(prices)
+        has_data = observed.any(axis=0)
+
+        cols = np.arange(len(tickers))
+        filled = self._forward_fill(prices, observed)
+        unit_values = filled / prices[observed.argmax(axis=0), cols]
+
+        # Returns between consecutive observations of each asset, which is
+        # what pct_change gives on the asset's own (unaligned) rows
+        daily_returns = np.full_like(prices, np.nan)
+        daily_returns[1:] = np.where(observed[1:], filled[1:] / filled[:-1] - 1, np.nan)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            avg_daily_returns = np.nanmean(daily_returns, axis=0) * 100
+            volatilities = np.nanstd(daily_returns, axis=0, ddof=1) * 100
+            max_prices = np.nanmax(prices, axis=0)
+            min_prices = np.nanmin(prices, axis=0)
+
+        dates = self.matrix.dates[start_row:]
+
+        paths = {}
+        for col, ticker in enumerate(tickers):
+            if not has_data[col]:
+                paths[ticker] = None
+                continue
+
+            rows = observed[:, col]
+            asset_returns = daily_returns[rows, col]
+            cumulative = np.cumprod(np.where(np.isnan(asset_returns), 1, 1 + asset_returns))
+            cumulative[0] = np.nan
+
+            paths[ticker] = {
+                'observed': rows,
+                'unit_values': unit_values[:, col],
+                'data': pd.DataFrame({
+                    'Date': pd.to_datetime(dates[rows]),
+                    'Close': prices[rows, col],
+                    'Daily_Return': asset_returns,
+                    'Cumulative_Return': cumulative,
+                }),
+                'avg_daily_return': avg_daily_returns[col],
+                'volatility': volatilities[col],
+                'current_price': filled[-1, col],
+                'max_price': max_prices[col],
+                'min_price': min_prices[col],
+            }
+
+        return paths
+
+    def unit_paths(self, tickers: list, start_row: int) -> dict:
+        """
+        Return cached unit-value paths for tickers from start_row, computing
+        the missing ones together. Tickers without data map to None.
+        """
+        paths = {}
+        with self._unit_paths_lock:
+            for ticker in tickers:
+                key = (ticker, start_row)
+                if key in self._unit_paths:
+                    self._unit_paths.move_to_end(key)
+                    paths[ticker] = self._unit_paths[key]
+
+        missing = [ticker for ticker in tickers if ticker not in paths]
+        if missing:
+            computed = self._compute_unit_paths(missing, start_row)
+            paths.update(computed)
+
+            with self._unit_paths_lock:
+                for ticker, path in computed.items():
+                    self._unit_paths[(ticker, start_row)] = path
+                while len(self._unit_paths) > UNIT_PATH_CACHE_SIZE:
+                    self._unit_paths.popitem(last=False)
+
+        return paths
+
+    def run(self, investment_amount: float, start_date, allocations: dict, asset_info: dict = None):
+        """
+        Simulate a lump-sum investment split across assets from start_date.
+
+        Args:
+            investment_amount: Total amount invested (allocation percentages apply to this)
+            start_date: First date of the simulation (string, date or datetime)
+            allocations: Dictionary mapping ticker to allocation percentage
+            asset_info: Optional dictionary mapping ticker to display metadata
+
+        Returns:
+            (results, errors) where results matches calculate_portfolio_returns
+            in the frontend (plus a 'combined' Series of the total value), or
+            None if no asset could be simulated or the allocations exceed 100%
+        """
+        error = _allocation_error(allocations)
+        if error:
+            return None, [error]
+
+        errors = []
+        tickers = []
+        for ticker, percentage in allocations.items():
+            if percentage <= 0:
+                continue
+            if ticker not in self.matrix:
+                errors.append(f"Could not load data for {ticker}")
+                continue
+            tickers.append(ticker)
+
+        start_row = int(np.searchsorted(self.matrix.dates, np.datetime64(pd.Timestamp(start_date).date(), 'D')))
+        paths = self.unit_paths(tickers, start_row)
+
+        for ticker in tickers:
+            if paths[ticker] is None:
+                errors.append(f"No data available for {ticker} from {start_date}")
+
+        tickers = [ticker for ticker in tickers if paths[ticker] is not None]
+        if not tickers:
+            return None, errors
+
+        amounts = np.array([(allocations[ticker] / 100) * investment_amount for ticker in tickers])
+
+        # Drop dates on which none of the selected assets traded
+        active_rows = np.logical_or.reduce([paths[ticker]['observed'] for ticker in tickers])
+        dates = self.matrix.dates[start_row:][active_rows]
+        unit_values = _held_unit_values(np.column_stack([paths[ticker]['unit_values'] for ticker in tickers]))
+        values = unit_values[active_rows] * amounts
+
+        final_values = values[-1]
+        gains = final_values - amounts
+        gain_pcts = gains / amounts * 100
+
+        breakdown = {}
+        for col, ticker in enumerate(tickers):
+            path = paths[ticker]
+            amount = amounts[col]
+            asset_values = path['unit_values'][path['observed']] * amount
+
+            breakdown[ticker] = {
+                'initial': amount,
+                'current': final_values[col],
+                'gain_loss': gains[col],
+                'gain_loss_pct': gain_pcts[col],
+                'volatility': path['volatility'],
+                'avg_daily_return': path['avg_daily_return'],
+                'current_price': path['current_price'],
+                'max_price': path['max_price'],
+                'min_price': path['min_price'],
+                'data': path['data'].assign(
+                    Portfolio_Value=asset_values,
+                    Gain_Loss=asset_values - amount,
+                    Gain_Loss_Pct=(asset_values - amount) / amount * 100,
+                ),
+                'info': (asset_info or {}).get(ticker),
+            }
+
+        total_current_value = final_values.sum()
+        total_gain_loss = gains.sum()
+
+        # Assets count as cash before their first observation
+        combined = pd.Series(
+            values.sum(axis=1),
+            index=pd.DatetimeIndex(pd.to_datetime(dates), name='Date'),
+            name='Total',
+        )
+
+        return {
+            'total_initial': investment_amount,
+            'total_current': total_current_value,
+            'total_gain_loss': total_gain_loss,
+            'total_gain_loss_pct': (total_gain_loss / investment_amount) * 100 if investment_amount > 0 else 0,
+            'breakdown': breakdown,
+            'combined': combined,
+        }, errors
+
+    def run_batch(self, investment_amount: float, start_date, candidates: list) -> list:
+        """
+        Evaluate many allocations over the same period with one matrix multiply.
+
+        Each candidate's value path is the (dates x assets) unit-value matrix
+        times its dollar amounts, plus any unallocated cash held flat.
+
+        Args:
+            investment_amount: Total amount invested per candidate
+            start_date: First date of the simulation
+            candidates: List of dictionaries mapping ticker to allocation percentage
+
+        Returns:
+            One dictionary per candidate with final_value, return_pct,
+            volatility (std of daily returns, %), max_drawdown_pct (<= 0) and
+            errors for tickers that were skipped. Candidates whose allocations
+            exceed 100% are not evaluated: their metrics are None and errors
+            says why.
+        """
+        start_row = int(np.searchsorted(self.matrix.dates, np.datetime64(pd.Timestamp(start_date).date(), 'D')))
+
+        requested = sorted({ticker for allocations in candidates for ticker, pct in allocations.items() if pct > 0})
+        known = [ticker for ticker in requested if ticker in self.matrix]
+        paths = self.unit_paths(known, start_row)
+        tickers = [ticker for ticker in known if paths[ticker] is not None]
+        columns = {ticker: col for col, ticker in enumerate(tickers)}
+
+        # Dollar amounts per (asset, candidate); skipped tickers stay in cash
+        weights = np.zeros((len(tickers), len(candidates)))
+        cash = np.full(len(candidates), float(investment_amount))
+        errors = [[] for _ in candidates]
+        rejected = set()
+        for idx, allocations in enumerate(candidates):
+            error = _allocation_error(allocations)
+            if error:
+                errors[idx].append(error)
+                rejected.add(idx)
+                continue
+            for ticker, percentage in allocations.items():
+                if percentage <= 0:
+                    continue
+                if ticker not in self.matrix:
+                    errors[idx].append(f"Could not load data for {ticker}")
+                elif ticker not in columns:
+                    errors[idx].append(f"No data available for {ticker} from {start_date}")
+                else:
+                    amount = (percentage / 100) * investment_amount
+                    weights[columns[ticker], idx] = amount
+                    cash[idx] -= amount
+
+        if not tickers:
+            return [
+                self._rejected(errors[idx]) if idx in rejected else
+                {'final_value': float(investment_amount), 'return_pct': 0.0, 'volatility': None,
+                 'max_drawdown_pct': 0.0, 'errors': errors[idx]}
+                for idx in range(len(candidates))
+            ]
+
+        observed = np.column_stack([paths[ticker]['observed'] for ticker in tickers])
+        unit_values = _held_unit_values(np.column_stack([paths[ticker]['unit_values'] for ticker in tickers]))
+
+        # Rows on which any asset of the candidate traded
+        active = (observed.astype(np.float64) @ (weights > 0)) > 0
+        values = unit_values @ weights + cash
+
+        # Returns from the first row on which the candidate traded, so a start
+        # on a non-trading day gives the same numbers as the next trading day
+        rows = np.arange(len(values))[:, None]
+        counted = active & (rows > active.argmax(axis=0))
+        daily_returns = np.full_like(values, np.nan)
+        daily_returns[1:] = np.where(counted[1:] & (values[:-1] > 0),
+                                     values[1:] / np.where(values[:-1] > 0, values[:-1], 1) - 1, np.nan)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            volatilities = np.nanstd(daily_returns, axis=0, ddof=1) * 100
+
+        running_max = np.maximum.accumulate(values, axis=0)
+        max_drawdowns = (values / np.where(running_max > 0, running_max, 1) - 1).min(axis=0) * 100
+
+        final_values = values[-1]
+        return_pcts = (final_values - investment_amount) / investment_amount * 100 if investment_amount > 0 else np.zeros(len(candidates))
+
+        return [
+            self._rejected(errors[idx]) if idx in rejected else
+            {
+                'final_value': float(final_values[idx]),
+                'return_pct': float(return_pcts[idx]),
+                'volatility': None if np.isnan(volatilities[idx]) else float(volatilities[idx]),
+                'max_drawdown_pct': float(max_drawdowns[idx]),
+                'errors': errors[idx],
+            }
+            for idx in range(len(candidates))
+        ]
+
+    @staticmethod
+    def _rejected(errors: list) -> dict:
+        return {'final_value': None, 'return_pct': None, 'volatility': None,
+                'max_drawdown_pct': None, 'errors': errors}
+
+
+# Engines keyed by the matrix and the extra frames merged into it, so reruns
+# with the same data and rates reuse the aligned matrix.
+ENGINE_CACHE_SIZE = 8
+
+_engine_cache = OrderedDict()
+_engine_cache_lock = threading.Lock()
+
+
+def get_portfolio_engine(matrix: PriceMatrix, extra_frames: dict = None) -> PortfolioEngine:
+    """
+    Return a (cached) engine over matrix with extra_frames merged in.
+
+    Args:
+        matrix: Shared price matrix (see get_data.get_price_matrix)
+        extra_frames: Optional dictionary mapping ticker to a DataFrame of
+            generated prices, e.g. fixed-income series at a custom rate.
+            Frames are identified by object identity, so callers should pass
+            cached frames to get cache hits.
+    """
+    extra_frames = extra_frames or {}
+    key = (id(matrix),) + tuple((ticker, id(df)) for ticker, df in sorted(extra_frames.items()))
+
+    with _engine_cache_lock:
+        entry = _engine_cache.get(key)
+        if entry is not None:
+            _engine_cache.move_to_end(key)
+            return entry[0]
+
+    engine = PortfolioEngine(matrix.with_columns(extra_frames) if extra_frames else matrix)
+
+    with _engine_cache_lock:
+        # Keep the keyed objects alive so their ids cannot be reused
+        _engine_cache[key] = (engine, matrix, extra_frames)
+        while len(_engine_cache) > ENGINE_CACHE_SIZE:
+            _engine_cache.popitem(last=False)
+
+    return engine
+
+
+def _load_engine(tickers, rates: dict = None, dataset_dir: str = DATASET_DIR) -> PortfolioEngine:
+    """Engine over the shared price matrix plus the generated series used by tickers"""
+    matrix = get_price_matrix(dataset_dir)
+
+    rates = {**GENERATED_ASSETS, **(rates or {})}
+    generated = {
+        ticker: generate_daily_compound_data(
+            start_date=FIXED_INCOME_START_DATE,
+            end_date=datetime.now(),
+            apy=rates[ticker],
+            initial_value=10000
+        )
+        for ticker in GENERATED_ASSETS if ticker in tickers
+    }
+
+    return get_portfolio_engine(matrix, generated)
+
+
+def simulate_portfolio(investment_amount: float, start_date, allocations: dict, rates: dict = None, dataset_dir: str = DATASET_DIR):
+    """
+    Simulate a portfolio over the shared price matrix.
+
+    Args:
+        investment_amount: Total amount invested
+        start_date: First date of the simulation
+        allocations: Dictionary mapping ticker to allocation percentage
+        rates: Optional dictionary mapping fixed-income ticker to APY (%),
+            defaults to GENERATED_ASSETS
+        dataset_dir: Directory holding the datasets and the price matrix
+
+    Returns:
+        (results, errors) as returned by PortfolioEngine.run
+    """
+    try:
+        engine = _load_engine({ticker for ticker, pct in allocations.items() if pct > 0}, rates, dataset_dir)
+        asset_info = {ticker: get_asset_info(ticker) for ticker in allocations}
+        return engine.run(investment_amount, start_date, allocations, asset_info)
+    except Exception as e:
+        return None, [str(e)]
+
+
+def simulate_portfolio_batch(investment_amount: float, start_date, candidates: list, rates: dict = None, dataset_dir: str = DATASET_DIR):
+    """
+    Evaluate many candidate allocations at once (see PortfolioEngine.run_batch).
+
+    Returns:
+        (results, errors) where results is a list with one summary per candidate
+    """
+    try:
+        tickers = {ticker for allocations in candidates for ticker, pct in allocations.items() if pct > 0}
+        engine = _load_engine(tickers, rates, dataset_dir)
+        return engine.run_batch(investment_amount, start_date, candidates), []
+    except Exception as e:
+        return None, [str(e)]
+
+
+def downsample_series(series: pd.Series, max_points: int) -> pd.Series:
+    """
+    Reduce series to at most max_points points for charting, keeping its visual shape.
+
+    Uses Largest-Triangle-Three-Buckets: the first and last points are kept,
+    the points in between are split into max_points - 2 buckets, and from
+    each bucket the point forming the largest triangle with the previously
+    kept point and the average of the next bucket is kept. Unlike evenly
+    spaced sampling this keeps peaks and crashes. A datetime index is used
+    as the x axis, otherwise the positions.
+    """
+    n = len(series)
+    if max_points <= 0 or n <= max_points:
+        return series
+    if max_points < 3:
+        return series.iloc[[0, n - 1][-max_points:]]
+
+    if isinstance(series.index, pd.DatetimeIndex):
+        x = series.index.asi8.astype(np.float64)
+    else:
+        x = np.arange(n, dtype=np.float64)
+    y = series.to_numpy(dtype=np.float64)
+
+    # Bucket k holds rows edges[k] to edges[k + 1] - 1; the last point stands
+    # in as the "next bucket" of the final one
+    every = (n - 2) / (max_points - 2)
+    edges = (np.arange(max_points - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[-1])
+
+    # Each choice depends on the previous one, so the scan is sequential;
+    # plain floats are much cheaper than NumPy calls on buckets this small
+    x, y, edges = x.tolist(), y.tolist(), edges.tolist()
+    selected = [0]
+    a = 0
+    for i in range(max_points - 2):
+        ax, ay = x[a], y[a]
+        dx, dy = ax - avg_x[i + 1], avg_y[i + 1] - ay
+        best_area, a = -1.0, edges[i]
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (y[j] - ay) - (ax - x[j]) * dy)
+            if area > best_area:
+                best_area, a = area, j
+        selected.append(a)
+    selected.append(n - 1)
+
+    return series.iloc[selected]
+
+
+def _json_number(value):
+    # NaN (e.g. the volatility of a single price) is not valid JSON
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def portfolio_to_json(results: dict, max_points: int = 250) -> dict:
+    """
+    Convert PortfolioEngine results into a JSON-serializable summary.
+
+    Per-asset paths are dropped and the combined total is downsampled to at
+    most max_points points.
+    """
+    breakdown = {}
+    for ticker, data in results['breakdown'].items():
+        breakdown[ticker] = {
+            key: _json_number(data[key])
+            for key in ('initial', 'current', 'gain_loss', 'gain_loss_pct', 'volatility',
+                        'avg_daily_return', 'current_price', 'max_price', 'min_price')
+        }
+        breakdown[ticker]['info'] = data['info']
+
+    combined = downsample_series(results['combined'], max_points)
+
+    return {
+        'total_initial': _json_number(results['total_initial']),
+        'total_current': _json_number(results['total_current']),
+        'total_gain_loss': _json_number(results['total_gain_loss']),
+        'total_gain_loss_pct': _json_number(results['total_gain_loss_pct']),
+        'breakdown': breakdown,
+        'combined': [
+            {'date': date.strftime('%Y-%m-%d'), 'value': _json_number(value)}
+            for date, value in combined.items()
+        ],
+    }
@@ -0,0 +1,280 @@
+"""
+Headless market data refresh service.
+
+Keeps every downloadable asset in the catalog up to date without anyone
+running fetch_financial_data.py by hand. Each ticker is refreshed once it is
+older than its asset type's maximum age, failures back off exponentially,
+and after every pass that added data the shared price matrix is rebuilt so
+the first user request after an update does not pay for it.
+
+Usage:
+    python refresh_daemon.py                        # Run forever
+    python refresh_daemon.py --once                 # One refresh pass, then exit
+    python refresh_daemon.py --metrics-port 9105    # Also serve /metrics
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+
+from assets import ASSET_CATEGORIES, ASSET_INFO, MARKET_ASSETS
+from fetch_financial_data import REFRESH_WORKERS, download_history, fetch_update, session_close
+from get_data import find_asset_dataset, get_price_matrix, load_asset_data, publish_datasets
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset')
+
+# Seconds after a successful refresh before a ticker is due again. Crypto
+# trades around the clock; stock data only changes once per trading day.
+MAX_AGE = {
+    'stock': float(getenv("REFRESH_STOCK_MAX_AGE", 6 * 3600)),
+    'crypto': float(getenv("REFRESH_CRYPTO_MAX_AGE", 3600)),
+}
+POLL_SECONDS = float(getenv("REFRESH_POLL_SECONDS", 60))
+BACKOFF_BASE = float(getenv("REFRESH_BACKOFF_BASE", 60))
+BACKOFF_MAX = float(getenv("REFRESH_BACKOFF_MAX", 3600))
+
+
+class TickerState:
+    def __init__(self, ticker, asset_type, symbol):
+        self.ticker = ticker
+        self.asset_type = asset_type
+        self.symbol = symbol
+        self.last_success = None
+        self.last_attempt = None
+        self.next_attempt = 0.0
+        self.failures = 0
+        self.rows_added = 0
+        self.last_error = None
+
+    def is_due(self, now):
+        if now < self.next_attempt:
+            return False
+        max_age = MAX_AGE.get(self.asset_type, MAX_AGE['stock'])
+        return self.last_success is None or now - self.last_success >= max_age
+
+
+class RefreshDaemon:
+    def __init__(self, dataset_dir=DATASET_DIR, download=download_history, max_workers=REFRESH_WORKERS,
+                 clock=time.time):
+        """
+        Args:
+            dataset_dir: Directory holding the datasets
+            download: Function (symbol, start=None) returning a yfinance-style frame
+            max_workers: Maximum concurrent downloads
+            clock: Time source, replaceable in tests
+        """
+        self.dataset_dir = dataset_dir
+        self.download = download
+        self.max_workers = max_workers
+        self.clock = clock
+        self.states = {
+            ticker: TickerState(ticker, ASSET_CATEGORIES[ticker], info['ticker_yf'])
+            for ticker, info in ASSET_INFO.items()
+            if info.get('ticker_yf')
+        }
+        self.passes = 0
+        self.last_warm_seconds = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # A restart should not refetch every ticker, so the stored data seeds last_success
+        for state in self.states.values():
+            state.last_success = self._stored_success(state)
+
+    def _stored_success(self, state):
+        """
+        When the stored dataset of a ticker was last known to be current, None without data
+
+        That is when it was written, but no later than the close of the first
+        session it lacks: a seed file copied or checked out recently can still
+        hold old data.
+        """
+        filepath = find_asset_dataset(state.ticker, state.asset_type, self.dataset_dir)
+        if filepath is None:
+            return None
+        dates = load_asset_data(state.ticker, state.asset_type, self.dataset_dir, columns=[])['Date']
+        if dates.empty:
+            return None
+        next_close = session_close(state.asset_type, dates.iloc[-1] + timedelta(days=1)).timestamp()
+        return min(os.path.getmtime(filepath), next_close, self.clock())
+
+    def _refresh(self, state):
+        try:
+            now = datetime.fromtimestamp(self.clock(), timezone.utc)
+            update = fetch_update(state.ticker, state.asset_type, state.symbol, self.dataset_dir, self.download, now)
+        except Exception as e:
+            return state, None, e
+        return state, update, None
+
+    def refresh_once(self):
+        """
+        Refresh every due ticker, then warm the caches if any data changed
+
+        Returns:
+            Dictionary mapping each refreshed ticker to rows added, or None on failure
+        """
+        now = self.clock()
+        with self._lock:
+            due = [state for state in self.states.values() if state.is_due(now)]
+
+        results = {}
+        frames = {}
+        publish_error = None
+        if due:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                outcomes = list(pool.map(self._refresh, due))
+
+            # One snapshot for every dataset this pass changed
+            for state, update, error in outcomes:
+                if error is None and update[1] is not None:
+                    frames[update[0]] = update[1]
+            if frames:
+                try:
+                    publish_datasets(frames, self.dataset_dir)
+                except Exception as e:
+                    publish_error = e
+
+            finished = self.clock()
+            with self._lock:
+                for state, update, error in outcomes:
+                    if error is None and update[1] is not None and publish_error is not None:
+                        error = publish_error
+                    rows = None if error is not None else update[2]
+                    state.last_attempt = finished
+                    if error is None:
+                        state.last_success = finished
+                        state.failures = 0
+                        state.next_attempt = 0.0
+                        state.rows_added += rows
+                        state.last_error = None
+                    else:
+                        state.failures += 1
+                        state.last_error = str(error)
+                        # Jitter keeps failing tickers from retrying in lockstep
+                        delay = min(BACKOFF_BASE * 2 ** (state.failures - 1), BACKOFF_MAX)
+                        state.next_attempt = finished + random.uniform(delay / 2, delay)
+                    results[state.ticker] = rows
+
+            for ticker, rows in sorted(results.items()):
+                if rows is None:
+                    print(f"  {ticker}: error - {self.states[ticker].last_error} "
+                          f"(attempt {self.states[ticker].failures}, retrying later)")
+                elif rows:
+                    print(f"  {ticker}: {rows} new records")
+
+        if (frames and publish_error is None) or self.passes == 0:
+            self.warm_caches()
+        self.passes += 1
+
+        return results
+
+    def warm_caches(self):
+        """Rebuild the shared price matrix, if stale, ahead of user requests"""
+        start = time.perf_counter()
+        get_price_matrix(self.dataset_dir)
+        self.last_warm_seconds = time.perf_counter() - start
+        print(f"  Warmed price matrix for {len(MARKET_ASSETS)} assets in {self.last_warm_seconds:.2f}s")
+
+    def run_forever(self, poll_seconds=POLL_SECONDS):
+        print(f"Refresh daemon started: {len(self.states)} assets, polling every {poll_seconds:.0f}s")
+        while not self._stop.is_set():
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"Refresh pass failed: {str(e)}")
+            self._stop.wait(poll_seconds)
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self):
+        """
+        Current refresh state per ticker
+
+        Returns:
+            Dictionary mapping ticker to last-refresh age (seconds, None if never
+            refreshed), consecutive failures and total rows added
+        """
+        now = self.clock()
+        with self._lock:
+            return {
+                ticker: {
+                    'last_refresh_age_seconds': None if state.last_success is None else now - state.last_success,
+                    'consecutive_failures': state.failures,
+                    'rows_added': state.rows_added,
+                }
+                for ticker, state in self.states.items()
+            }
+
+    def metrics_text(self):
+        """Metrics in the Prometheus text exposition format"""
+        metrics = sorted(self.metrics().items())
+
+        def age(values):
+            seconds = values['last_refresh_age_seconds']
+            return "+Inf" if seconds is None else f"{seconds:.1f}"
+
+        lines = []
+        for name, kind, value in (
+            ("investorly_refresh_last_success_age_seconds", "gauge", age),
+            ("investorly_refresh_consecutive_failures", "gauge", lambda values: values['consecutive_failures']),
+            ("investorly_refresh_rows_added_total", "counter", lambda values: values['rows_added']),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f'{name}{{ticker="{ticker}"}} {value(values)}' for ticker, values in metrics)
+        if self.last_warm_seconds is not None:
+            lines.append("# TYPE investorly_refresh_cache_warm_seconds gauge")
+            lines.append(f"investorly_refresh_cache_warm_seconds {self.last_warm_seconds:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(daemon, port):
+    """Serve daemon.metrics_text() at /metrics on a background thread"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = daemon.metrics_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the market datasets up to date")
+    parser.add_argument("--once", action="store_true", help="Run one refresh pass and exit")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="Seconds between passes")
+    parser.add_argument("--workers", type=int, default=REFRESH_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    daemon = RefreshDaemon(max_workers=args.workers)
+    if args.metrics_port:
+        serve_metrics(daemon, args.metrics_port)
+
+    if args.once:
+        results = daemon.refresh_once()
+        if any(rows is None for rows in results.values()):
+            raise SystemExit(1)
+    else:
+        daemon.run_forever(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+In-process cache of LLM answers.
+
+Entries are keyed on a hash of the rendered system prompt plus the
+normalized user message, expire after a TTL, and are evicted least recently
+used first. With a similarity threshold set, a miss on the exact key falls
+back to comparing the question against cached questions that share the same
+system prompt, so paraphrases ("What's an ETF" / "what is an etf?") can be
+answered from the cache as well.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+
+import numpy as np
+
+RESPONSE_CACHE_TTL = float(getenv("LLM_CACHE_TTL", 3600))
+RESPONSE_CACHE_SIZE = int(getenv("LLM_CACHE_SIZE", 1024))
+# Cosine similarity needed for a paraphrase hit; unset keeps the cache exact-only
+RESPONSE_CACHE_SIMILARITY = float(getenv("LLM_CACHE_SIMILARITY")) if getenv("LLM_CACHE_SIMILARITY") else None
+
+EMBEDDING_DIM = 512
+
+_CONTRACTIONS = {"what's": "what is", "it's": "it is", "how's": "how is", "that's": "that is", "there's": "there is"}
+
+
+def normalize_message(message):
+    """Lowercase, expand common contractions, drop punctuation and collapse whitespace"""
+    text = message.lower().replace("’", "'")
+    for short, full in _CONTRACTIONS.items():
+        text = text.replace(short, full)
+    return " ".join(re.sub(r"[^\w\s%$.]|\.(?!\d)", " ", text).split())
+
+
+def embed_message(normalized):
+    """
+    Hashed character-trigram vector of a normalized message, L2-normalized
+
+    Cheap enough to run on every request and good at catching reworded or
+    re-punctuated questions; swap in a model embedding via ResponseCache(embed=...)
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    padded = f"  {normalized} "
+    for i in range(len(padded) - 2):
+        digest = hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ResponseCache:
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_SIZE,
+                 similarity=RESPONSE_CACHE_SIMILARITY, embed=embed_message):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embed = embed
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires_at, prompt_hash, vector or None, response)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prompt_hash(system_prompt):
+        return hashlib.sha256(system_prompt.encode()).hexdigest()
+
+    @staticmethod
+    def _key(prompt_hash, normalized):
+        return hashlib.sha256(f"{prompt_hash}\x00{normalized}".encode()).hexdigest()
+
+    def key(self, system_prompt, user_message):
+        """Exact-match key for a question under a system prompt"""
+        return self._key(self._prompt_hash(system_prompt), normalize_message(user_message))
+
+    def get(self, system_prompt, user_message):
+        """
+        Look up a cached response
+
+        Args:
+            system_prompt: Rendered system prompt the answer was generated with
+            user_message: String containing the user's message
+
+        Returns:
+            Cached response string, or None on a miss
+        """
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return None
+
+        prompt_hash = self._prompt_hash(system_prompt)
+        normalized = normalize_message(user_message)
+        key = self._key(prompt_hash, normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is None and self.similarity is not None:
+                key, entry = self._nearest(prompt_hash, self.embed(normalized), now)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def _nearest(self, prompt_hash, vector, now):
+        best_key, best_entry, best_score = None, None, self.similarity
+        for key, entry in self._entries.items():
+            expires_at, entry_prompt, entry_vector, _ = entry
+            if entry_prompt != prompt_hash or expires_at <= now or entry_vector is None:
+                continue
+            score = float(np.dot(vector, entry_vector))
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        return best_key, best_entry
+
+    def put(self, system_prompt, user_message, response):
+        """Store a response, evicting the least recently used entries past max_entries"""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        prompt_hash = self._prompt_hash(system_prompt)
+        normalized = normalize_message(user_message)
+        key = self._key(prompt_hash, normalized)
+        vector = self.embed(normalized) if self.similarity is not None else None
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, prompt_hash, vector, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return entry count and hit/miss counters"""
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
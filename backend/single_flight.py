@@ -0,0 +1,221 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+Concurrent callers with the same key share one upstream call: for plain
+completions every caller gets the leader's result, and for streams one
+producer reads the upstream stream into a shared buffer that every caller
+replays from the start and then follows live. Flights are forgotten as soon
+as they finish; answers that outlive the burst come from ResponseCache.
+
+SingleFlight is for threaded servers (Flask), AsyncSingleFlight for the
+event loop in asgi.py.
+"""
+
+import asyncio
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.result = None
+        self._cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self.done)
+
+    def follow(self):
+        """Yield every chunk from the start; re-raise the producer's error at the end"""
+        idx = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: idx < len(self.chunks) or self.done)
+                chunks, done = self.chunks[idx:], self.done
+            for chunk in chunks:
+                yield chunk
+            idx += len(chunks)
+            if done and idx == len(self.chunks):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key, flight, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(error)
+
+    def call(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identity of the request
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            The result of the leader's fn()
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            flight.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            self._land(key, flight, e)
+            raise
+        self._land(key, flight)
+        return flight.result
+
+    def stream(self, key, produce):
+        """
+        Share one stream between all concurrent callers with the same key
+
+        The stream is read on a background thread, so it runs to completion
+        (and can be cached) even if the caller that started it disconnects.
+
+        Args:
+            key: Hashable identity of the request
+            produce: Zero-argument callable returning an iterator of chunks
+
+        Returns:
+            Iterator over every chunk of the shared stream
+        """
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, produce), daemon=True).start()
+        return flight.follow()
+
+    def _produce(self, key, flight, produce):
+        try:
+            for chunk in produce():
+                flight.publish(chunk)
+        except Exception as e:
+            self._land(key, flight, e)
+            return
+        self._land(key, flight)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+class _AsyncFlight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self._changed:
+            self.error = error
+            self.done = True
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Async version of _Flight.follow"""
+        idx = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: idx < len(self.chunks) or self.done)
+                chunks, done = self.chunks[idx:], self.done
+            for chunk in chunks:
+                yield chunk
+            idx += len(chunks)
+            if done and idx == len(self.chunks):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self.coalesced = 0
+
+    async def call(self, key, fn):
+        """
+        Async version of SingleFlight.call; fn is a zero-argument coroutine function
+
+        The shared call runs as its own task, so one caller being cancelled
+        does not cancel it for the others.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stream(self, key, produce):
+        """
+        Async version of SingleFlight.stream; produce returns an async iterator of chunks
+
+        Returns:
+            Async iterator over every chunk of the shared stream
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _AsyncFlight()
+            # Keep a reference so the producer task is not garbage collected
+            flight.task = asyncio.ensure_future(self._produce(key, flight, produce))
+        else:
+            self.coalesced += 1
+        return flight.follow()
+
+    async def _produce(self, key, flight, produce):
+        error = None
+        try:
+            async for chunk in produce():
+                await flight.publish(chunk)
+        except Exception as e:
+            error = e
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+        await flight.finish(error)
+
+    def in_flight(self):
+        return len(self._calls) + len(self._streams)
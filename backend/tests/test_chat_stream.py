@@ -0,0 +1,112 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+TOKENS = ["An ", "ETF ", "is ", "a ", "fund."]
+
+
+class FakeCompletions(BaseHTTPRequestHandler):
+    """OpenAI-compatible streaming endpoint; server.mode picks how it behaves"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.server.mode == "fail":
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens = TOKENS[:2] if self.server.mode == "break" else TOKENS
+        for token in tokens:
+            chunk = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": request["model"],
+                     "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        if self.server.mode == "break":
+            # Drop the connection mid-stream, without the terminating chunk
+            self.close_connection = True
+            return
+        self._chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def fake_llm():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletions)
+    server.mode = "ok"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def client(fake_llm, monkeypatch):
+    monkeypatch.setenv("GROQ_TOKEN", "test")
+    monkeypatch.setenv("GROQ_BASE_URL", f"http://127.0.0.1:{fake_llm.server_port}/v1")
+    import app
+    from chat import Chat
+
+    monkeypatch.setattr(app, "chat_instance", Chat())
+    return app.app.test_client()
+
+
+def stream(client, question):
+    response = client.post("/api/v1/llm", json={"messages": [{"role": "user", "content": question}], "stream": True})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def tokens(body):
+    return "".join(json.loads(line[len("data: "):]).get("token", "")
+                   for line in body.splitlines() if line.startswith("data: "))
+
+
+def test_stream_ends_with_done(client):
+    body = stream(client, "What is an ETF?")
+    assert tokens(body) == "".join(TOKENS)
+    assert body.rstrip().endswith("event: done\ndata: {}")
+
+
+def test_stream_broken_mid_answer_ends_with_error_event(client, fake_llm):
+    from chat import ERROR_RESPONSE
+
+    fake_llm.mode = "break"
+    body = stream(client, "What is a bond?")
+    assert tokens(body) == "".join(TOKENS[:2])
+    assert "event: error" in body
+    assert "event: done" not in body
+    assert ERROR_RESPONSE not in body
+
+
+def test_stream_failing_before_any_token_sends_fallback(client, fake_llm):
+    from chat import ERROR_RESPONSE
+
+    fake_llm.mode = "fail"
+    body = stream(client, "What is a CD?")
+    assert tokens(body) == ERROR_RESPONSE
+    assert "event: done" in body
+
+
+def test_stream_reports_prompt_failure_as_error_event(client, monkeypatch):
+    import app
+
+    def fail(*args, **kwargs):
+        raise TypeError("unsupported format string passed to NoneType.__format__")
+
+    monkeypatch.setattr(app.chat_instance, "build_messages", fail)
+    body = stream(client, "How is my portfolio doing?")
+    assert "event: error" in body
+    assert "event: done" not in body
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from assets import MARKET_ASSETS
+from get_data import COMPACT_ASSET_MAX_BYTES, load_asset_data, memory_budget
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataset")
+
+
+def test_compact_frame_keeps_ticker_only_when_asked():
+    prices = load_asset_data("SPY", "etf", DATASET_DIR, compact=True)
+    assert list(prices.columns) == ["Adj Close"]
+
+    with_ticker = load_asset_data("SPY", "etf", DATASET_DIR, compact=True, columns=["Ticker"])
+    assert list(with_ticker.columns) == ["Adj Close", "Ticker"]
+    assert with_ticker["Ticker"].dtype == "category"
+    assert prices["Adj Close"].dtype == with_ticker["Adj Close"].dtype == "float32"
+
+
+def test_catalog_fits_the_compact_memory_budget():
+    budget = memory_budget(MARKET_ASSETS, DATASET_DIR)
+
+    for ticker, sizes in budget.items():
+        assert sizes["compact_bytes"] <= COMPACT_ASSET_MAX_BYTES
+        assert sizes["full_bytes"] >= 4 * sizes["compact_bytes"], ticker
+
+
+def test_memory_budget_rejects_frames_over_budget():
+    with pytest.raises(ValueError, match="SPY"):
+        memory_budget({"SPY": "etf"}, DATASET_DIR, max_bytes=1024)
@@ -0,0 +1,57 @@
+import pytest
+
+from conversation import ConversationMemory, estimate_tokens
+
+
+def make_history(turns, size=200):
+    history = []
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"{role} turn {i} " + "x" * size})
+    return history
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    monkeypatch.setenv("GROQ_TOKEN", "test")
+    from chat import Chat
+
+    chat = Chat()
+    chat.memory = ConversationMemory(token_budget=300)
+    return chat
+
+
+def tokens(turns):
+    return sum(estimate_tokens(turn["content"]) for turn in turns)
+
+
+def test_failed_summary_keeps_pending_turns_within_budget(chat, monkeypatch):
+    monkeypatch.setattr(chat, "summarize", lambda previous, turns: None)
+    history = make_history(9)
+
+    summary, recent = chat.prepare_history(history)
+
+    assert summary is None
+    assert recent[-1] == history[-1]
+    assert recent == history[-len(recent):]
+    # More than the half-budget tail plan() keeps, but still within the budget
+    _, _, _, tail = chat.memory.plan(history)
+    assert len(recent) > len(tail)
+    assert tokens(recent) <= chat.memory.token_budget
+
+
+def test_pending_turns_are_summarized_once_the_model_recovers(chat, monkeypatch):
+    calls = []
+
+    def summarize(previous, turns):
+        calls.append(turns)
+        return None if len(calls) == 1 else "summary"
+
+    monkeypatch.setattr(chat, "summarize", summarize)
+    chat.prepare_history(make_history(9))
+    summary, recent = chat.prepare_history(make_history(11))
+
+    assert summary == "summary"
+    # The retry covers the turns the failed call should have folded in
+    assert calls[1][:len(calls[0])] == calls[0]
+    assert tokens(recent) <= chat.memory.token_budget
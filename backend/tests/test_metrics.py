@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import get_data
+
+
+def price_frame(prices):
+    dates = pd.bdate_range("2024-01-01", periods=len(prices))
+    return pd.DataFrame({"Date": dates, "Adj Close": prices})
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    prices = 100 * np.cumprod(1 + rng.normal(0.0005, 0.01, 500))
+    prices[[0, 17, 18, 250, 499]] = np.nan
+    return prices
+
+
+def assert_metrics_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert np.isclose(actual[key], expected[key], rtol=1e-12, equal_nan=False), key
+
+
+def test_missing_prices_are_skipped(prices):
+    df = price_frame(prices)
+    metrics = get_data.get_performance_metrics(df)
+
+    assert all(np.isfinite(value) for value in metrics.values())
+    assert_metrics_equal(metrics, get_data.get_performance_metrics(df.dropna()))
+
+
+def test_loop_and_numpy_kernels_agree_on_missing_prices(prices):
+    # The plain-Python loop is what numba compiles
+    loop = get_data._performance_loop(prices, 0.0001)
+    vectorized = get_data._performance_numpy(prices, 0.0001)
+    np.testing.assert_allclose(loop, vectorized, rtol=1e-12)
+    np.testing.assert_allclose(loop, get_data._performance_numpy(prices[~np.isnan(prices)], 0.0001), rtol=1e-12)
+
+
+def test_compiled_kernel_agrees_with_numpy(prices):
+    pytest.importorskip("numba")
+
+    # The kernel the metrics functions actually call, not a fresh compile
+    assert get_data.HAS_NUMBA and get_data._performance_kernel is not get_data._performance_numpy
+    for series in (prices, prices[~np.isnan(prices)]):
+        np.testing.assert_allclose(get_data._performance_kernel(series, 0.0001),
+                                   get_data._performance_numpy(series, 0.0001), rtol=1e-12)
+
+
+def test_streamed_metrics_skip_missing_prices(prices):
+    df = price_frame(prices)
+    chunks = (df.iloc[i:i + 16] for i in range(0, len(df), 16))
+    metrics, path = get_data.stream_performance_metrics(chunks, max_points=50)
+
+    assert_metrics_equal(metrics, get_data.get_performance_metrics(df))
+    assert not path.isna().any()
+
+
+def test_all_missing_prices_raise(prices):
+    with pytest.raises(ValueError):
+        get_data.get_performance_metrics(price_frame(np.full(5, np.nan)))
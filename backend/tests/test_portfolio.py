@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from portfolio import simulate_portfolio, simulate_portfolio_batch
+
+
+def batch(start_date, candidates):
+    results, errors = simulate_portfolio_batch(10000, start_date, candidates)
+    assert not errors
+    return results
+
+
+def test_weekend_start_matches_next_trading_day():
+    saturday, monday = batch("2019-01-05", [{"SPY": 100}]), batch("2019-01-07", [{"SPY": 100}])
+
+    assert saturday[0]["max_drawdown_pct"] == pytest.approx(monday[0]["max_drawdown_pct"])
+    assert saturday[0]["volatility"] == pytest.approx(monday[0]["volatility"])
+    assert saturday[0]["max_drawdown_pct"] > -50
+
+
+@pytest.mark.parametrize("allocations", [{"SOL": 100}, {"BTC": 50, "SOL": 50}])
+def test_batch_matches_run_for_late_listing_asset(allocations):
+    # SOL starts trading in 2020, so it is held as cash until then
+    [summary] = batch("2019-01-05", [allocations])
+    results, errors = simulate_portfolio(10000, "2019-01-05", allocations)
+    assert not errors
+    combined = results["combined"]
+
+    assert summary["final_value"] == pytest.approx(results["total_current"])
+    assert summary["max_drawdown_pct"] == pytest.approx(((combined / combined.cummax() - 1).min()) * 100)
+    assert summary["volatility"] == pytest.approx(combined.pct_change().std() * 100)
+    assert np.isfinite(combined).all() and combined.min() > 0
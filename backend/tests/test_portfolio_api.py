@@ -0,0 +1,65 @@
+import pytest
+
+VALID = {"investment_amount": 10000, "start_date": "2020-01-02", "allocations": {"SPY": 100}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("GROQ_TOKEN", "test")
+    import app
+
+    return app.app.test_client()
+
+
+def post(client, path, **changes):
+    body = {**VALID, **changes}
+    if path.endswith("/batch"):
+        body["candidates"] = [body.pop("allocations")]
+    return client.post(path, json={k: v for k, v in body.items() if v is not ...})
+
+
+PATHS = ["/api/v1/portfolio", "/api/v1/portfolio/batch"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_valid_request_succeeds(client, path):
+    assert post(client, path).status_code == 200
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("amount", ["nan", "inf", "-inf", float("nan")])
+def test_non_finite_amount_is_rejected(client, path, amount):
+    response = post(client, path, investment_amount=amount)
+    assert response.status_code == 400
+    assert "finite" in response.json["message"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("pct", ["nan", "inf", float("inf")])
+def test_non_finite_allocation_is_rejected(client, path, pct):
+    response = post(client, path, allocations={"SPY": 50, "QQQ": pct})
+    assert response.status_code == 400
+    assert "finite" in response.json["message"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("start_date", ["not a date", "2020-13-45", "NaT", ["2020-01-02"]])
+def test_unparseable_start_date_is_rejected(client, path, start_date):
+    response = post(client, path, start_date=start_date)
+    assert response.status_code == 400
+    assert "start_date" in response.json["message"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("rates", [[4.5], "4.5", {"CD": "4.5"}, {"CD": True}, {"CD": float("nan")}, {"CD": float("inf")}])
+def test_invalid_rates_are_rejected(client, path, rates):
+    response = post(client, path, rates=rates)
+    assert response.status_code == 400
+    assert "rates" in response.json["message"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_rates_may_be_omitted_or_null(client, path):
+    assert post(client, path, rates=None).status_code == 200
+    assert post(client, path, rates=...).status_code == 200
+    assert post(client, path, allocations={"SPY": 50, "CD": 50}, rates={"CD": 4.5}).status_code == 200
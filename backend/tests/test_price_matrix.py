@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import get_data
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    get_data.clear_dataset_cache()
+    return str(tmp_path)
+
+
+def publish(dataset_dir, last_price):
+    dates = pd.bdate_range("2026-01-01", periods=20)
+    prices = np.linspace(100.0, last_price, len(dates))
+    df = pd.DataFrame({"Date": dates, "Close": prices, "Adj Close": prices, "Ticker": "SPY"})
+    return get_data.publish_datasets({"spy.csv": df}, dataset_dir)
+
+
+def test_published_matrix_staleness_uses_the_manifest_only(dataset_dir, monkeypatch):
+    version = publish(dataset_dir, 110.0)
+    matrix = get_data.get_price_matrix(dataset_dir)
+    assert matrix.dataset_version == version
+
+    def listdir(path):
+        raise AssertionError("staleness check scanned the dataset directory")
+
+    monkeypatch.setattr(get_data.os, "listdir", listdir)
+    assert get_data.get_price_matrix(dataset_dir) is matrix
+    monkeypatch.undo()
+
+    version = publish(dataset_dir, 120.0)
+    rebuilt = get_data.get_price_matrix(dataset_dir)
+    assert rebuilt.dataset_version == version
+    assert rebuilt.column("SPY")[-1] == 120.0
+
+
+def test_seed_files_newer_than_the_matrix_make_it_stale(dataset_dir):
+    dates = pd.bdate_range("2026-01-01", periods=20)
+    seed = pd.DataFrame({"Date": dates, "Close": 100.0, "Adj Close": 100.0, "Ticker": "SPY"})
+    seed.to_csv(f"{dataset_dir}/spy.csv", index=False)
+    matrix = get_data.get_price_matrix(dataset_dir)
+    assert matrix.dataset_version is None
+    assert not get_data._price_matrix_stale(matrix, dataset_dir)
+
+    seed["Adj Close"] = 101.0
+    seed.to_csv(f"{dataset_dir}/spy.csv", index=False)
+    stat = get_data.os.stat(f"{dataset_dir}/spy.csv")
+    get_data.os.utime(f"{dataset_dir}/spy.csv", (stat.st_atime, matrix.built_at + 1))
+    assert get_data._price_matrix_stale(matrix, dataset_dir)
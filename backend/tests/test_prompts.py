@@ -0,0 +1,41 @@
+from prompts import render_system_prompt
+
+NAN = float("nan")
+
+
+def asset(ticker, gain_loss, **fields):
+    return {"ticker": ticker, "name": ticker, "category": "Stock", "initial_investment": 1000,
+            "current_value": 1000 + (gain_loss or 0), "gain_loss": gain_loss, "gain_loss_pct": 1.5,
+            "volatility": 1.2, **fields}
+
+
+def test_missing_figures_render_as_not_available():
+    context = {
+        "user_settings": {"investment_amount": 10000, "risk_tolerance": 5},
+        "portfolio_performance": {"initial_investment": 10000, "current_value": None,
+                                  "total_gain_loss": None, "total_gain_loss_pct": NAN, "unallocated_cash": None},
+        "asset_breakdown": [
+            asset("SPY", 250.0),
+            asset("HY_SAVINGS", None, volatility=None, gain_loss_pct=None),
+            asset("CD", 0.0, volatility=NAN),
+        ],
+        "investment_dates": {"start_date": "2026-10-17", "current_date": "2026-10-17"},
+    }
+
+    prompt = render_system_prompt(context)
+
+    assert "Current Value: n/a" in prompt
+    assert "Total Gain/Loss: n/a (n/a)" in prompt
+    assert "Unallocated Cash" not in prompt
+    assert "HY_SAVINGS (HY_SAVINGS):" in prompt and "Volatility: n/a" in prompt
+    assert "$nan" not in prompt and "nan%" not in prompt
+    # None ranks as zero, after the asset with a real gain
+    assert prompt.index("SPY (SPY)") < prompt.index("HY_SAVINGS (HY_SAVINGS)")
+
+
+def test_missing_figures_are_left_out_of_category_totals():
+    assets = [asset("SPY", 250.0), asset("VOO", None, initial_investment=None, current_value=None)]
+
+    prompt = render_system_prompt({"asset_breakdown": assets}, max_assets=0)
+
+    assert "2 other Stock holdings: Initial: $1,000, Current: $1,250, Gain/Loss: $250" in prompt
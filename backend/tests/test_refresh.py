@@ -0,0 +1,201 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import pytest
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+class FakeYahoo:
+    """Ticker.history stand-in serving a fixed daily history, with an optional unfinished bar"""
+
+    def __init__(self, dates):
+        index = pd.DatetimeIndex(dates, name="Date").tz_localize(NEW_YORK)
+        close = np.linspace(100.0, 110.0, len(index))
+        self.history = pd.DataFrame({
+            "Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Adj Close": close,
+            "Volume": 1000, "Dividends": 0.0, "Stock Splits": 0.0,
+        }, index=index)
+        self.calls = []
+
+    def __call__(self, symbol, start=None, period="10y"):
+        self.calls.append(start)
+        if start is None:
+            return self.history.copy()
+        return self.history[self.history.index >= pd.Timestamp(start, tz=NEW_YORK)].copy()
+
+
+@pytest.fixture
+def fetch(tmp_path, monkeypatch):
+    # fetch_financial_data creates ./dataset on import
+    monkeypatch.chdir(tmp_path)
+    import fetch_financial_data
+    return fetch_financial_data
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    from get_data import clear_dataset_cache
+
+    clear_dataset_cache()
+    return str(tmp_path / "dataset")
+
+
+def seed(fetch, dataset_dir, yahoo, last_date):
+    stored = fetch.normalize_download(yahoo.history, "SPY")
+    fetch.save_dataset(stored[stored["Date"] <= last_date], f"{dataset_dir}/spy.csv")
+
+
+def stored(dataset_dir):
+    from get_data import load_asset_data, load_manifest
+
+    return load_asset_data("SPY", "etf", dataset_dir), load_manifest(dataset_dir)["version"]
+
+
+def at(hour, day="2026-10-16"):
+    return datetime.fromisoformat(f"{day}T{hour:02d}:00").replace(tzinfo=NEW_YORK)
+
+
+def test_open_session_bar_is_not_stored_and_same_day_rerun_is_a_no_op(fetch, dataset_dir):
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-13"))
+
+    assert fetch.refresh_ticker("SPY", "stock", "SPY", dataset_dir, yahoo, now=at(12)) == 2
+    df, version = stored(dataset_dir)
+    assert df["Date"].iloc[-1] == pd.Timestamp("2026-10-15")
+    # The overlap window was downloaded again
+    assert yahoo.calls[-1] == "2026-10-08"
+
+    assert fetch.refresh_ticker("SPY", "stock", "SPY", dataset_dir, yahoo, now=at(15)) == 0
+    assert stored(dataset_dir)[1] == version
+
+    # After the close the day's bar is final
+    assert fetch.refresh_ticker("SPY", "stock", "SPY", dataset_dir, yahoo, now=at(17)) == 1
+    df, _ = stored(dataset_dir)
+    assert df["Date"].iloc[-1] == pd.Timestamp("2026-10-16")
+    assert not df["Date"].duplicated().any()
+
+
+def test_overlap_overwrites_corrected_bars(fetch, dataset_dir):
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-14"))
+    corrected = pd.Timestamp("2026-10-14", tz=NEW_YORK)
+    yahoo.history.loc[corrected, ["Close", "Adj Close"]] += 0.5
+
+    assert fetch.refresh_ticker("SPY", "stock", "SPY", dataset_dir, yahoo, now=at(12)) == 1
+    df, _ = stored(dataset_dir)
+    row = df[df["Date"] == pd.Timestamp("2026-10-14")]
+    assert row["Close"].item() == yahoo.history.loc[corrected, "Close"]
+    assert len(yahoo.calls) == 1
+
+
+def test_dividend_downloads_the_full_history_again(fetch, dataset_dir):
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-14"))
+
+    # Ex-dividend on the 15th: Yahoo scales every earlier Adj Close
+    ex_date = pd.Timestamp("2026-10-15", tz=NEW_YORK)
+    yahoo.history.loc[ex_date, "Dividends"] = 1.0
+    yahoo.history.loc[yahoo.history.index < ex_date, "Adj Close"] *= 0.99
+
+    assert fetch.refresh_ticker("SPY", "stock", "SPY", dataset_dir, yahoo, now=at(12)) == 1
+    assert yahoo.calls == ["2026-10-09", "2026-09-01"]
+
+    df, _ = stored(dataset_dir)
+    expected = yahoo.history.loc[yahoo.history.index <= ex_date, "Adj Close"].to_numpy()
+    np.testing.assert_allclose(df["Adj Close"].to_numpy(), expected)
+    assert "Dividends" not in df.columns
+
+
+def test_crypto_day_is_final_at_midnight_utc(fetch):
+    utc = ZoneInfo("UTC")
+    assert fetch.last_closed_session("crypto", datetime(2026, 10, 16, 23, 0, tzinfo=utc)) == pd.Timestamp("2026-10-15")
+    assert fetch.last_closed_session("crypto", datetime(2026, 10, 17, 0, 5, tzinfo=utc)) == pd.Timestamp("2026-10-16")
+
+
+def snapshots(dataset_dir):
+    import os
+
+    return os.listdir(os.path.join(dataset_dir, "snapshots"))
+
+
+def test_refresh_pass_publishes_one_snapshot(fetch, dataset_dir):
+    from assets import ASSET_INFO
+    from get_data import load_manifest
+
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    results = fetch.refresh_all_assets(dataset_dir, download=yahoo)
+
+    assert all(results.values())
+    assert len(snapshots(dataset_dir)) == 1
+    downloadable = [ticker for ticker, info in ASSET_INFO.items() if info.get("ticker_yf")]
+    assert len(load_manifest(dataset_dir)["files"]) == len(downloadable)
+
+
+def test_daemon_pass_publishes_one_snapshot(fetch, dataset_dir):
+    from refresh_daemon import RefreshDaemon
+
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    daemon = RefreshDaemon(dataset_dir, download=yahoo)
+    results = daemon.refresh_once()
+
+    assert all(results.values())
+    assert len(snapshots(dataset_dir)) == 1
+
+
+def test_load_resolves_again_when_the_snapshot_is_pruned(fetch, dataset_dir, monkeypatch):
+    import os
+
+    import get_data
+
+    yahoo = FakeYahoo(pd.bdate_range("2026-09-01", "2026-10-16"))
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-13"))
+    stale = get_data._find_dataset(dataset_dir, "spy.csv")
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-14"))
+    monkeypatch.setattr(get_data, "DATASET_SNAPSHOT_KEEP", 0)
+    seed(fetch, dataset_dir, yahoo, pd.Timestamp("2026-10-15"))
+    assert not os.path.exists(stale)
+
+    # Resolved before the publish that pruned it
+    find_dataset = get_data._find_dataset
+    paths = iter([stale])
+    monkeypatch.setattr(get_data, "_find_dataset", lambda *args: next(paths, None) or find_dataset(*args))
+
+    df = get_data.load_asset_data("SPY", "etf", dataset_dir)
+    assert df["Date"].iloc[-1] == pd.Timestamp("2026-10-15")
+
+
+def test_restarted_daemon_counts_stored_data_as_refreshed(fetch, dataset_dir):
+    from refresh_daemon import RefreshDaemon
+
+    yahoo = FakeYahoo(pd.date_range("2026-09-01", "2026-10-17"))
+    clock = at(17).timestamp
+    RefreshDaemon(dataset_dir, download=yahoo, clock=clock).refresh_once()
+    downloads = len(yahoo.calls)
+
+    daemon = RefreshDaemon(dataset_dir, download=yahoo, clock=clock)
+    assert all(values["last_refresh_age_seconds"] == 0 for values in daemon.metrics().values())
+    assert daemon.refresh_once() == {}
+    assert len(yahoo.calls) == downloads
+
+
+def test_hourly_crypto_refresh_waits_for_the_utc_day_to_close(fetch, dataset_dir):
+    from get_data import load_asset_data
+    from refresh_daemon import RefreshDaemon
+
+    utc = ZoneInfo("UTC")
+    yahoo = FakeYahoo(pd.date_range("2026-09-01", "2026-10-17"))
+    now = [datetime(2026, 10, 16, 12, tzinfo=utc).timestamp()]
+    daemon = RefreshDaemon(dataset_dir, download=yahoo, clock=lambda: now[0])
+    daemon.refresh_once()
+    assert load_asset_data("BTC", "crypto", dataset_dir)["Date"].iloc[-1] == pd.Timestamp("2026-10-15")
+
+    now[0] += 3600
+    assert daemon.refresh_once()["BTC"] == 0
+    assert len(snapshots(dataset_dir)) == 1
+
+    now[0] = datetime(2026, 10, 17, 1, tzinfo=utc).timestamp()
+    assert daemon.refresh_once()["BTC"] == 1
+    assert load_asset_data("BTC", "crypto", dataset_dir)["Date"].iloc[-1] == pd.Timestamp("2026-10-16")
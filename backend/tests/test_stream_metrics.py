@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import get_data
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataset")
+START, END = "2018-01-01", "2024-01-01"
+
+
+@pytest.fixture(params=["parquet", "csv"])
+def dataset_dir(request, tmp_path):
+    # Only the CSVs are checked in; the Parquet copies are built here rather
+    # than relying on a --convert run or the Docker build
+    for ticker in ("spy.csv", "crypto_btc.csv"):
+        shutil.copy(os.path.join(DATASET_DIR, ticker), tmp_path)
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+        assert get_data.convert_dataset_dir(str(tmp_path)) == 2
+        # Leave nothing but Parquet to read
+        for ticker in ("spy.csv", "crypto_btc.csv"):
+            os.remove(tmp_path / ticker)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("ticker, asset_type", [("SPY", "etf"), ("BTC", "crypto")])
+@pytest.mark.parametrize("chunk_rows", [1, 7, 256, 65536])
+def test_streamed_metrics_match_whole_frame_metrics(dataset_dir, ticker, asset_type, chunk_rows):
+    full = get_data.filter_by_date_range(get_data.load_asset_data(ticker, asset_type, dataset_dir), START, END)
+    returns = get_data.calculate_returns(full)
+    expected = get_data.get_performance_metrics(returns)
+
+    chunks = get_data.iter_asset_chunks(ticker, asset_type, dataset_dir, chunk_rows=chunk_rows,
+                                        columns=["Adj Close"], start_date=START, end_date=END)
+    metrics, path = get_data.stream_performance_metrics(chunks, max_points=100)
+
+    for key, value in expected.items():
+        assert np.isclose(metrics[key], value, rtol=1e-9), key
+    assert len(path) <= 101
+    assert path.index[0] == full["Date"].iloc[0] and path.index[-1] == full["Date"].iloc[-1]
+    portfolio_value = returns.set_index("Date")["Portfolio_Value"]
+    np.testing.assert_allclose(path.to_numpy(), portfolio_value.loc[path.index].to_numpy())
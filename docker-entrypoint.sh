@@ -0,0 +1,29 @@
+#!/bin/sh
+set -e
+
+# The dataset directory is a named volume shared by the services. Docker only
+# copies the image's files into a named volume when the volume is created, so
+# copy over any seed dataset that is newer in this image on every start.
+SEED_DIR=/app/dataset-seed
+DATASET_DIR=/app/backend/dataset
+
+if [ -d "$SEED_DIR" ] && [ -d "$DATASET_DIR" ]; then
+    updated=0
+    for src in "$SEED_DIR"/*.csv "$SEED_DIR"/*.parquet; do
+        [ -e "$src" ] || continue
+        dest="$DATASET_DIR/$(basename "$src")"
+        if [ ! -e "$dest" ] || [ "$src" -nt "$dest" ]; then
+            # Copy beside the target and rename, so readers never see a partial file
+            cp -p "$src" "$dest.$$.tmp"
+            mv "$dest.$$.tmp" "$dest"
+            updated=1
+        fi
+    done
+
+    # Make the next request rebuild the shared price matrix from the new seeds
+    if [ "$updated" = 1 ]; then
+        rm -f "$DATASET_DIR/price_matrix.json"
+    fi
+fi
+
+exec "$@"
@@ -1,15 +1,21 @@
+import math
 import os
 import sys
+import uuid
 from datetime import datetime, timedelta
 
 import streamlit as st
 import requests
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
-from get_data import load_etf_data, load_crypto_data, load_index_data, load_fixed_income_data, calculate_returns, get_performance_metrics, filter_by_date_range
-from generate_fixed_income_data import generate_daily_compound_data
+from assets import ASSETS, get_asset_category
+from portfolio import CHART_MAX_POINTS, downsample_series, simulate_portfolio
+
+from backend_client import BackendClient, StreamInterrupted
 
 BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL", "http://localhost:5000")
+# The chat endpoint can be served separately by the async server (backend/asgi.py)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", BACKEND_BASE_URL)
 
 st.set_page_config(
     page_title="Investorly",
@@ -179,41 +185,16 @@ investment_map = {
     "$50,000+": 50000
 }
 
-ASSETS = {
-    'stock': {
-        'SPY': {'name': 'SPDR S&P 500 ETF Trust', 'icon': '🕷️', 'category': 'Stock', 'ticker_yf': 'SPY'},
-        'VOO': {'name': 'Vanguard S&P 500 ETF', 'icon': '🏛️', 'category': 'Stock', 'ticker_yf': 'VOO'},
-        'QQQ': {'name': 'Invesco QQQ (Nasdaq-100)', 'icon': '🚀', 'category': 'Stock', 'ticker_yf': 'QQQ'},
-        'VTI': {'name': 'Vanguard Total Stock Market ETF', 'icon': '📊', 'category': 'Stock', 'ticker_yf': 'VTI'},
-        'IVV': {'name': 'iShares Core S&P 500 ETF', 'icon': '🏢', 'category': 'Stock', 'ticker_yf': 'IVV'},
-        'SCHD': {'name': 'Schwab US Dividend Equity ETF', 'icon': '💵', 'category': 'Stock', 'ticker_yf': 'SCHD'},
-        'VUG': {'name': 'Vanguard Growth ETF', 'icon': '📈', 'category': 'Stock', 'ticker_yf': 'VUG'},
-        'IWM': {'name': 'iShares Russell 2000 ETF', 'icon': '🏭', 'category': 'Stock', 'ticker_yf': 'IWM'},
-        'VEA': {'name': 'Vanguard FTSE Developed Markets ETF', 'icon': '🌍', 'category': 'Stock', 'ticker_yf': 'VEA'},
-        'AGG': {'name': 'iShares Core US Aggregate Bond ETF', 'icon': '📜', 'category': 'Stock', 'ticker_yf': 'AGG'},
-    },
-    'crypto': {
-        'BTC': {'name': 'Bitcoin', 'icon': '₿', 'category': 'Cryptocurrency', 'ticker_yf': 'BTC-USD'},
-        'ETH': {'name': 'Ethereum', 'icon': '⟠', 'category': 'Cryptocurrency', 'ticker_yf': 'ETH-USD'},
-        'BNB': {'name': 'Binance Coin', 'icon': '🔶', 'category': 'Cryptocurrency', 'ticker_yf': 'BNB-USD'},
-        'SOL': {'name': 'Solana', 'icon': '◎', 'category': 'Cryptocurrency', 'ticker_yf': 'SOL-USD'},
-        'XRP': {'name': 'Ripple', 'icon': '💧', 'category': 'Cryptocurrency', 'ticker_yf': 'XRP-USD'},
-        'ADA': {'name': 'Cardano', 'icon': '₳', 'category': 'Cryptocurrency', 'ticker_yf': 'ADA-USD'},
-        'DOGE': {'name': 'Dogecoin', 'icon': '🐕', 'category': 'Cryptocurrency', 'ticker_yf': 'DOGE-USD'},
-        'AVAX': {'name': 'Avalanche', 'icon': '🔺', 'category': 'Cryptocurrency', 'ticker_yf': 'AVAX-USD'},
-    },
-    'fixed_income': {
-        'HY_SAVINGS': {'name': 'High-Yield Savings (Capital One 3.40% APY)', 'icon': '🏦', 'category': 'Fixed Income', 'ticker_yf': None},
-        'CD': {'name': 'Certificate of Deposit (Capital One 3.50% APY)', 'icon': '💰', 'category': 'Fixed Income', 'ticker_yf': None},
-    }
-}
-
 if 'right_panel_visible' not in st.session_state:
     st.session_state.right_panel_visible = True
 
 if 'chat_messages' not in st.session_state:
     st.session_state.chat_messages = []
 
+# Lets the backend cache the summary of older chat turns for this conversation
+if 'chat_session_id' not in st.session_state:
+    st.session_state.chat_session_id = uuid.uuid4().hex
+
 if 'investment_amount' not in st.session_state:
     st.session_state.investment_amount = 10000
 
@@ -241,125 +222,28 @@ if 'hy_savings_rate' not in st.session_state:
 if 'cd_rate' not in st.session_state:
     st.session_state.cd_rate = 3.50  # Default CD APY
 
-def get_asset_type(ticker):
-    for category, assets in ASSETS.items():
-        if ticker in assets:
-            if category == 'crypto':
-                return 'crypto'
-            elif category == 'indices':
-                return 'index'
-            elif category == 'fixed_income':
-                return 'fixed_income'
-            else:
-                return 'etf'
-    return 'etf'
-
-def load_data_safe(ticker):
-    try:
-        dataset_dir = os.path.join(os.path.dirname(__file__), '..', 'backend', 'dataset')
-        asset_type = get_asset_type(ticker)
-
-        if asset_type == 'crypto':
-            return load_crypto_data(ticker, dataset_dir)
-        elif asset_type == 'index':
-            return load_index_data(ticker, dataset_dir)
-        elif asset_type == 'fixed_income':
-            # Generate data dynamically based on custom rates
-            if ticker == 'HY_SAVINGS':
-                rate = st.session_state.get('hy_savings_rate', 3.40)
-            elif ticker == 'CD':
-                rate = st.session_state.get('cd_rate', 3.50)
-            else:
-                return load_fixed_income_data(ticker.lower(), dataset_dir)
-
-            # Generate data from 2015-11-25 to today
-            start_date = datetime(2015, 11, 25)
-            end_date = datetime.now()
-
-            # Generate dynamic data with custom rate
-            df = generate_daily_compound_data(
-                start_date=start_date,
-                end_date=end_date,
-                apy=rate,  
-                initial_value=10000
-            )
-            return df
-        else:
-            return load_etf_data(ticker, dataset_dir)
-    except Exception as e:
-        return None
-
 def calculate_portfolio_returns(investment_amount, investment_date, allocations):
-    try:
-        total_current_value = 0
-        total_gain_loss = 0
-        breakdown = {}
-        errors = []
-
-        for asset, percentage in allocations.items():
-            if percentage <= 0:
-                continue
-
-            dollar_amount = (percentage / 100) * investment_amount
-
-            df = load_data_safe(asset)
-            if df is None:
-                errors.append(f"Could not load data for {asset}")
-                continue
-
-            df_filtered = filter_by_date_range(df, start_date=str(investment_date))
-            if df_filtered.empty:
-                errors.append(f"No data available for {asset} from {investment_date}")
-                continue
-
-            df_returns = calculate_returns(df_filtered, initial_investment=dollar_amount)
-            metrics = get_performance_metrics(df_returns)
-
-            asset_info = None
-            for category, assets in ASSETS.items():
-                if asset in assets:
-                    asset_info = assets[asset]
-                    break
-
-            breakdown[asset] = {
-                'initial': dollar_amount,
-                'current': metrics['final_value'],
-                'gain_loss': metrics['total_return_dollar'],
-                'gain_loss_pct': metrics['total_return_pct'],
-                'volatility': metrics['volatility'],
-                'avg_daily_return': metrics['avg_daily_return'],
-                'current_price': metrics['current_price'],
-                'max_price': metrics['max_price'],
-                'min_price': metrics['min_price'],
-                'data': df_returns,
-                'info': asset_info
-            }
-
-            total_current_value += metrics['final_value']
-            total_gain_loss += metrics['total_return_dollar']
-
-        if not breakdown:
-            return None, errors
+    # Fixed-income series are generated from the user's custom rates
+    rates = {
+        'HY_SAVINGS': st.session_state.get('hy_savings_rate', 3.40),
+        'CD': st.session_state.get('cd_rate', 3.50),
+    }
+    return simulate_portfolio(investment_amount, investment_date, allocations, rates=rates)
 
-        return {
-            'total_initial': investment_amount,
-            'total_current': total_current_value,
-            'total_gain_loss': total_gain_loss,
-            'total_gain_loss_pct': (total_gain_loss / investment_amount) * 100 if investment_amount > 0 else 0,
-            'breakdown': breakdown
-        }, errors
-    except Exception as e:
-        return None, [str(e)]
+def round_finite(value, ndigits=None):
+    """Round a number for the chat context, or None when it is NaN or infinite"""
+    if value is None or not math.isfinite(value):
+        return None
+    return round(value, ndigits)
 
-def get_all_tickers():
-    tickers = []
-    for category, assets in ASSETS.items():
-        tickers.extend(list(assets.keys()))
-    return sorted(tickers)
+@st.cache_resource
+def get_backend_client():
+    """Keep-alive client for the chat endpoint, shared by every session"""
+    return BackendClient(LLM_BASE_URL)
 
 def get_ai_response(messages, portfolio_results, investment_date, normalized_allocations):
     """
-    Call the Flask backend to get AI chatbot response
+    Call the Flask backend and stream the AI chatbot response
     
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
@@ -367,9 +251,10 @@ def get_ai_response(messages, portfolio_results, investment_date, normalized_all
         investment_date: Date of investment
         normalized_allocations: Current asset allocations
     
-    Returns:
-        String response from the AI or fallback response on error
+    Yields:
+        Text chunks of the AI response, or the fallback response on error
     """
+    streamed = False
     try:
         settings = {
             "experience_level": "beginner",
@@ -386,12 +271,13 @@ def get_ai_response(messages, portfolio_results, investment_date, normalized_all
             total_gain_loss = total_current_with_cash - st.session_state.investment_amount
             total_gain_loss_pct = (total_gain_loss / st.session_state.investment_amount) * 100 if st.session_state.investment_amount > 0 else 0
             
+            # Whole dollars and 2-decimal percentages are all the prompt shows
             portfolio_performance = {
                 "initial_investment": st.session_state.investment_amount,
-                "current_value": total_current_with_cash,
-                "total_gain_loss": total_gain_loss,
-                "total_gain_loss_pct": total_gain_loss_pct,
-                "unallocated_cash": unallocated_cash
+                "current_value": round_finite(total_current_with_cash),
+                "total_gain_loss": round_finite(total_gain_loss),
+                "total_gain_loss_pct": round_finite(total_gain_loss_pct, 2),
+                "unallocated_cash": round_finite(unallocated_cash)
             }
 
         asset_breakdown = []
@@ -402,12 +288,11 @@ def get_ai_response(messages, portfolio_results, investment_date, normalized_all
                     "ticker": asset,
                     "name": asset_info.get('name', asset),
                     "category": asset_info.get('category', 'Unknown'),
-                    "initial_investment": data['initial'],
-                    "current_value": data['current'],
-                    "gain_loss": data['gain_loss'],
-                    "gain_loss_pct": data['gain_loss_pct'],
-                    "volatility": data['volatility'],
-                    "current_price": data['current_price']
+                    "initial_investment": round_finite(data['initial']),
+                    "current_value": round_finite(data['current']),
+                    "gain_loss": round_finite(data['gain_loss']),
+                    "gain_loss_pct": round_finite(data['gain_loss_pct'], 2),
+                    "volatility": round_finite(data['volatility'], 2),
                 })
 
         context = {
@@ -420,22 +305,29 @@ def get_ai_response(messages, portfolio_results, investment_date, normalized_all
             }
         }
         
-        response = requests.post(
-            f"{BACKEND_BASE_URL}/api/v1/llm",
-            json={"messages": messages, "context": context},
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            messageAI = data.get("response", "I'm having trouble responding right now.")
-            return messageAI
-        
+        try:
+            for token in get_backend_client().stream_events(
+                "/api/v1/llm",
+                {
+                    "messages": messages,
+                    "context": context,
+                    "session_id": st.session_state.chat_session_id,
+                    "stream": True,
+                },
+            ):
+                streamed = True
+                yield token
+        except requests.HTTPError:
+            yield "I'm having trouble responding right now."
+
     except Exception as e:
         print(e)
-        # Fallback to keyword-based responses if backend is unreachable
-        return get_fallback_response(messages[-1]["content"])
+        if streamed or isinstance(e, StreamInterrupted):
+            # Part of the answer is already on screen; don't append a different one
+            yield "\n\n*(The response was interrupted. Please try again.)*"
+        else:
+            # Fallback to keyword-based responses if backend is unreachable
+            yield get_fallback_response(messages[-1]["content"])
 
 def get_risk_from_allocation(allocations):
     """
@@ -457,13 +349,11 @@ def get_risk_from_allocation(allocations):
     crypto_total = 0
 
     for ticker, pct in allocations.items():
-        for category, assets in ASSETS.items():
-            if ticker in assets:
-                if category == 'stock':
-                    stock_total += pct
-                elif category == 'crypto':
-                    crypto_total += pct
-                break
+        category = get_asset_category(ticker)
+        if category == 'stock':
+            stock_total += pct
+        elif category == 'crypto':
+            crypto_total += pct
 
     total_invested = stock_total + crypto_total
 
@@ -545,10 +435,7 @@ def get_risk_based_allocation(risk_level, enabled_assets=None):
 
         enabled_in_category = [
             ticker for ticker in enabled_assets
-            if any(ticker in assets for cat, assets in ASSETS.items() if cat.replace('_', ' ') == category.replace('_', ' ') or
-                   (category == 'stock' and cat == 'stock') or
-                   (category == 'crypto' and cat == 'crypto') or
-                   (category == 'fixed_income' and cat == 'fixed_income'))
+            if get_asset_category(ticker) == category
         ]
 
         if enabled_in_category:
@@ -960,7 +847,7 @@ with middle_col:
                     with st.container(border=True):
                         asset_info = data.get('info', {})
                         st.write(f"**{asset_info.get('icon', '📊')} {asset} Performance**")
-                        chart_data = data['data'].set_index('Date')['Portfolio_Value']
+                        chart_data = downsample_series(data['data'].set_index('Date')['Portfolio_Value'], CHART_MAX_POINTS)
                         st.line_chart(chart_data, width='stretch', height=200)
 
                         current = data['data']['Portfolio_Value'].iloc[-1]
@@ -975,7 +862,7 @@ with middle_col:
                         with st.container(border=True):
                             asset_info = data.get('info', {})
                             st.write(f"**{asset_info.get('icon', '📊')} {asset} Performance**")
-                            chart_data = data['data'].set_index('Date')['Portfolio_Value']
+                            chart_data = downsample_series(data['data'].set_index('Date')['Portfolio_Value'], CHART_MAX_POINTS)
                             st.line_chart(chart_data, width='stretch', height=200)
 
                             current = data['data']['Portfolio_Value'].iloc[-1]
@@ -987,24 +874,9 @@ with middle_col:
             with st.container(border=True):
                 st.write("**📈 Combined Portfolio Over Time**")
 
-                # Combine all asset data by date
-                combined_data = None
-                for asset, data in portfolio_results['breakdown'].items():
-                    df = data['data'][['Date', 'Portfolio_Value']].copy()
-                    df = df.rename(columns={'Portfolio_Value': asset})
-                    df = df.set_index('Date')
-
-                    if combined_data is None:
-                        combined_data = df
-                    else:
-                        combined_data = combined_data.join(df, how='outer')
-
-                if combined_data is not None:
-                    # Fill NaN appropriately
-                    combined_data = combined_data.ffill().fillna(0)
-                    combined_data['Total'] = combined_data.sum(axis=1)
-
-                    st.line_chart(combined_data[['Total']], width='stretch', height=300)
+                # Total value across assets, aligned by date in the portfolio engine
+                combined_data = downsample_series(portfolio_results['combined'], CHART_MAX_POINTS).to_frame()
+                st.line_chart(combined_data[['Total']], width='stretch', height=300)
 
         else:
             if errors:
@@ -1106,15 +978,18 @@ with right_col:
                     "content": user_input
                 })
 
-                # Show loading spinner while getting AI response
-                with st.spinner("🤔 Thinking..."):
-                    # Get AI response from backend with full context
-                    ai_response = get_ai_response(
-                        st.session_state.chat_messages,
-                        portfolio_results,
-                        investment_date,
-                        normalized_allocations
-                    )
+                with chat_container:
+                    with st.chat_message("user"):
+                        st.write(user_input)
+
+                    # Render the AI response from the backend as it streams in
+                    with st.chat_message("assistant"):
+                        ai_response = st.write_stream(get_ai_response(
+                            st.session_state.chat_messages,
+                            portfolio_results,
+                            investment_date,
+                            normalized_allocations
+                        ))
 
                 # Add AI response to chat history
                 st.session_state.chat_messages.append({
@@ -1126,4 +1001,5 @@ with right_col:
 
             if st.button("Clear Chat", width='stretch', key="clear_chat"):
                 st.session_state.chat_messages = []
+                st.session_state.chat_session_id = uuid.uuid4().hex
                 st.rerun()
@@ -0,0 +1,178 @@
+"""
+Pooled HTTP client for frontend-to-backend calls.
+
+One BackendClient is shared by every Streamlit session (see get_backend_client
+in app.py), so chat turns reuse keep-alive connections instead of opening a
+new one per request. It also bounds in-flight requests, retries connection
+failures and 5xx responses with jittered backoff, and trips a circuit breaker
+after repeated failures so callers fall back immediately while the backend is
+down instead of waiting out the read timeout.
+"""
+
+import json
+import random
+import threading
+import time
+from os import getenv
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BACKEND_POOL_SIZE = int(getenv("BACKEND_POOL_SIZE", 20))
+BACKEND_MAX_CONCURRENT = int(getenv("BACKEND_MAX_CONCURRENT", 20))
+BACKEND_CONNECT_TIMEOUT = float(getenv("BACKEND_CONNECT_TIMEOUT", 3))
+BACKEND_READ_TIMEOUT = float(getenv("BACKEND_READ_TIMEOUT", 30))
+BACKEND_RETRIES = int(getenv("BACKEND_RETRIES", 2))
+BACKEND_BACKOFF = float(getenv("BACKEND_BACKOFF", 0.25))
+BREAKER_FAILURES = int(getenv("BACKEND_BREAKER_FAILURES", 3))
+BREAKER_COOLDOWN = float(getenv("BACKEND_BREAKER_COOLDOWN", 30))
+
+# How long a request waits for a free slot before giving up
+QUEUE_TIMEOUT = 2.0
+
+
+class BackendUnavailable(Exception):
+    """The backend is down, overloaded, or the circuit breaker is open"""
+
+
+class StreamInterrupted(Exception):
+    """The backend ended a stream with an 'error' event part way through the answer"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failures and rejects calls for
+    `cooldown` seconds; then lets a single trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self._opened_at < self.cooldown else "half-open"
+
+
+class BackendClient:
+    def __init__(self, base_url, pool_size=BACKEND_POOL_SIZE, max_concurrent=BACKEND_MAX_CONCURRENT,
+                 retries=BACKEND_RETRIES, backoff=BACKEND_BACKOFF, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = (BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT)
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter keeps sessions that failed together from retrying in lockstep
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _open(self, path, payload, stream):
+        """
+        POST with retries, returning an open response with status < 500
+
+        Raises:
+            BackendUnavailable: Breaker open, or every attempt failed
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise BackendUnavailable(f"Circuit open for {self.base_url}") from last_error
+            try:
+                response = self.session.post(f"{self.base_url}{path}", json=payload,
+                                             timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            except requests.RequestException as e:
+                # Not worth retrying, but it still settles a half-open trial
+                self.breaker.record_failure()
+                raise BackendUnavailable(f"{path} failed: {e}") from e
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                response.close()
+                last_error = BackendUnavailable(f"{path} returned {response.status_code}")
+
+            self.breaker.record_failure()
+            if attempt < self.retries:
+                self._sleep_before_retry(attempt)
+
+        raise BackendUnavailable(f"{path} failed after {self.retries + 1} attempts") from last_error
+
+    def stream_events(self, path, payload):
+        """
+        POST a JSON payload and yield the 'token' of each server-sent event
+        until the 'done' event
+
+        Retries only happen before the first token, so a reply is never
+        duplicated.
+
+        Raises:
+            BackendUnavailable: Backend down, overloaded, or circuit open
+            requests.HTTPError: Backend rejected the request (4xx)
+            StreamInterrupted: Backend sent an 'error' event
+        """
+        if not self._slots.acquire(timeout=QUEUE_TIMEOUT):
+            raise BackendUnavailable("Too many requests in flight")
+        try:
+            with self._open(path, payload, stream=True) as response:
+                response.raise_for_status()
+                try:
+                    event = None
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line.startswith("event: done"):
+                            break
+                        if line.startswith("event: "):
+                            event = line[len("event: "):]
+                        elif line.startswith("data: "):
+                            data = json.loads(line[len("data: "):])
+                            if event == "error":
+                                raise StreamInterrupted(data.get("message", "Stream interrupted"))
+                            if data.get("token"):
+                                yield data["token"]
+                        elif not line:
+                            event = None
+                except requests.RequestException:
+                    # Includes ChunkedEncodingError when the connection drops mid-stream
+                    self.breaker.record_failure()
+                    raise
+        finally:
+            self._slots.release()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The frontend modules import each other as top-level modules. Appended, so a
+# combined run with backend/tests still resolves the backend's own app module.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import requests
+
+from backend_client import BackendClient, BackendUnavailable, CircuitBreaker
+
+COOLDOWN = 0.05
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self.lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+
+@pytest.fixture
+def client():
+    return BackendClient("http://backend", retries=0, breaker=CircuitBreaker(failures=1, cooldown=COOLDOWN))
+
+
+def open_breaker(breaker):
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(COOLDOWN)
+    assert breaker.state == "half-open"
+
+
+@pytest.mark.parametrize("error", [requests.TooManyRedirects("loop"), requests.exceptions.InvalidURL("bad")])
+def test_failed_half_open_trial_lets_a_later_trial_through(client, monkeypatch, error):
+    open_breaker(client.breaker)
+    responses = [error, FakeResponse(["data: {\"token\": \"hi\"}", "", "event: done", "data: {}"])]
+
+    def post(*args, **kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(client.session, "post", post)
+
+    with pytest.raises(BackendUnavailable):
+        list(client.stream_events("/api/v1/llm", {}))
+    time.sleep(COOLDOWN)
+
+    assert list(client.stream_events("/api/v1/llm", {})) == ["hi"]
+    assert client.breaker.state == "closed"
+
+
+def test_connection_dropped_mid_stream_counts_as_failure(client, monkeypatch):
+    lines = ["data: {\"token\": \"hi\"}", "", requests.exceptions.ChunkedEncodingError("connection broken")]
+    monkeypatch.setattr(client.session, "post", lambda *args, **kwargs: FakeResponse(lines))
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        list(client.stream_events("/api/v1/llm", {}))
+
+    assert client.breaker.state == "open"